@@ -76,7 +76,7 @@ ssh "$RUNPOD_HOST" << 'EOF'
     source <(grep -v '^#' /workspace/.env | grep -v '^$' | grep '=')
     set +a
     export PYTHONPATH=/workspace
-    export PYTORCH_CUDA_ALLOC_CONF="expandable_segments:True"
+    export PYTORCH_CUDA_ALLOC_CONF="expandable_segments:True,garbage_collection_threshold:0.8"
 
     # Check if supervisor is running
     if pgrep -f "supervisord.*supervisord.conf" > /dev/null; then
@@ -20,42 +20,95 @@ Exit Codes:
 import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 # Ensure workspace is in path for imports
 sys.path.insert(0, "/workspace")
 
-from supabase import create_client
+import orjson
+from supabase import ClientOptions, create_client
 
 from workers.core import get_settings, create_repository
 
+# Optional: NVML bindings (nvidia-ml-py) read GPU counters in-process.
+# Without them, check_gpu falls back to forking nvidia-smi.
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
 EXPECTED_WORKERS = 4
 WORKER_SCRIPT_PATTERN = "workers/factory/worker.py"
 
+# Queue is stalled when idle workers leave a downloaded call waiting this long
+STALL_THRESHOLD_SECS = 15 * 60
+
+# Per-request PostgREST timeout: a hung database must not wedge the watchdog
+DB_TIMEOUT_SECS = 5
+
 
 # =============================================================================
 # CHECK FUNCTIONS
 # =============================================================================
 
-def check_workers() -> tuple[str, int, bool]:
+def _count_processes_proc(pattern: str) -> int:
     """
-    Check worker process count.
+    Count python processes running a script matching pattern via /proc.
 
-    Returns:
-        (status_message, worker_count, is_healthy)
+    Reads /proc/<pid>/cmdline in-process instead of forking pgrep. A process
+    matches when argv[0] is a python interpreter and one of its arguments
+    ends with pattern.
     """
+    suffix = pattern.encode()
+    own_pid = str(os.getpid())
+    count = 0
+
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit() or entry.name == own_pid:
+            continue
+        try:
+            with open(f"/proc/{entry.name}/cmdline", "rb") as f:
+                args = f.read().split(b"\0")
+        except OSError:
+            continue  # Process exited mid-scan or is not readable
+
+        if not os.path.basename(args[0]).startswith(b"python"):
+            continue
+        if any(arg.endswith(suffix) for arg in args[1:]):
+            count += 1
+
+    return count
+
+
+def _count_processes_pgrep(pattern: str) -> int:
+    """Count processes matching pattern with pgrep (non-Linux fallback)."""
     try:
         result = subprocess.run(
-            ["pgrep", "-fc", f"python3.*{WORKER_SCRIPT_PATTERN}"],
+            ["pgrep", "-fc", f"python3.*{pattern}"],
             capture_output=True,
             text=True,
+            timeout=5,
         )
-        count = int(result.stdout.strip()) if result.returncode == 0 else 0
-    except (subprocess.SubprocessError, ValueError):
-        count = 0
+        return int(result.stdout.strip()) if result.returncode == 0 else 0
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return 0
+
+
+def check_workers() -> tuple[str, int, bool]:
+    """
+    Check worker process count.
+
+    Returns:
+        (status_message, worker_count, is_healthy)
+    """
+    if os.path.isdir("/proc"):
+        count = _count_processes_proc(WORKER_SCRIPT_PATTERN)
+    else:
+        count = _count_processes_pgrep(WORKER_SCRIPT_PATTERN)
 
     is_healthy = count == EXPECTED_WORKERS
 
@@ -73,85 +126,112 @@ def check_workers() -> tuple[str, int, bool]:
     return message, count, is_healthy
 
 
-def check_database(settings) -> tuple[str, bool]:
+def _probe_database(repo) -> str | None:
     """
-    Check database connectivity.
+    Minimal connectivity probe (fetch one row id).
 
     Returns:
-        (status_message, is_healthy)
+        None if the database answered, otherwise a short error message
     """
     try:
-        client = create_client(settings.supabase_url, settings.supabase_service_role_key)
-        repo = create_repository(client)
-
-        # Simple connectivity test - fetch one row
-        schema = client.schema("core")
-        schema.from_("calls").select("id").limit(1).execute()
-
-        return "✅ Database: Connected", True
-
+        repo.schema.from_("calls").select("id").limit(1).execute()
+        return None
     except Exception as e:
-        error_msg = str(e)[:50]
-        return f"🔴 Database: Connection failed ({error_msg})", False
+        return str(e)[:50]
 
 
-def check_queue(settings) -> tuple[str, dict, bool, bool]:
+def check_database_and_queue(repo) -> tuple[str, str, dict, bool, bool, bool]:
     """
-    Check queue health and detect stalls.
+    Check database connectivity and queue health in one round-trip.
+
+    Uses the core.health_snapshot() RPC: a successful call proves the
+    database is reachable and returns all status counts from one scan.
+    Only when the RPC fails is a separate connectivity probe issued, to
+    tell "database down" apart from "snapshot RPC broken".
+
+    Args:
+        repo: Shared CallsRepository (built once in main)
 
     Returns:
-        (status_message, stats, is_healthy, is_stalled)
+        (db_message, queue_message, stats, db_healthy, queue_healthy, is_stalled)
     """
     try:
-        client = create_client(settings.supabase_url, settings.supabase_service_role_key)
-        repo = create_repository(client)
-        stats = repo.get_queue_stats()
+        stats = repo.get_health_snapshot()
+    except Exception as e:
+        error_msg = str(e)[:50]
+        queue_msg = f"🔴 Queue: Failed to fetch stats ({error_msg})"
 
-        processing = stats.get("processing", 0)
-        downloaded = stats.get("downloaded", 0)
-        pending = stats.get("pending", 0)
-        transcribed = stats.get("transcribed", 0)
-        flagged = stats.get("flagged", 0)
-        safe = stats.get("safe", 0)
-        failed = stats.get("failed", 0)
+        db_error = _probe_database(repo)
+        if db_error is None:
+            return "✅ Database: Connected", queue_msg, {}, True, False, False
+        return f"🔴 Database: Connection failed ({db_error})", queue_msg, {}, False, False, False
 
-        # Calculate totals
-        success = transcribed + flagged + safe
-        total = sum(stats.values())
+    processing = stats.get("processing", 0)
+    downloaded = stats.get("downloaded", 0)
+    pending = stats.get("pending", 0)
+    transcribed = stats.get("transcribed", 0)
+    flagged = stats.get("flagged", 0)
+    safe = stats.get("safe", 0)
+    failed = stats.get("failed", 0)
+    downloaded_age = stats.get("downloaded_age_seconds", 0)
 
-        # Stall detection: Workers idle but work available
-        is_stalled = processing == 0 and downloaded > 0
+    # Calculate totals
+    success = transcribed + flagged + safe
+    total = pending + downloaded + processing + success + failed
 
-        # Build status message
-        lines = []
+    # Stall detection: workers idle and the oldest ready call has waited past
+    # the threshold (a momentary processing == 0 between claims is normal)
+    is_stalled = processing == 0 and downloaded_age > STALL_THRESHOLD_SECS
 
-        if is_stalled:
-            lines.append("⚠️  Queue: STALLED (workers idle with work available)")
-        else:
-            lines.append("✅ Queue: Healthy")
+    # Build status message
+    lines = []
+
+    if is_stalled:
+        lines.append(f"⚠️  Queue: STALLED (workers idle, oldest ready call waiting {downloaded_age // 60}m)")
+    else:
+        lines.append("✅ Queue: Healthy")
 
-        lines.append(f"   ├─ Processing:  {processing:>5}")
-        lines.append(f"   ├─ Ready:       {downloaded:>5}")
-        lines.append(f"   ├─ Waiting:     {pending:>5}")
-        lines.append(f"   ├─ Success:     {success:>5} (transcribed={transcribed}, flagged={flagged}, safe={safe})")
-        lines.append(f"   └─ Failed:      {failed:>5}")
-        lines.append(f"   Total: {total}")
+    lines.append(f"   ├─ Processing:  {processing:>5}")
+    lines.append(f"   ├─ Ready:       {downloaded:>5}")
+    lines.append(f"   ├─ Waiting:     {pending:>5}")
+    lines.append(f"   ├─ Success:     {success:>5} (transcribed={transcribed}, flagged={flagged}, safe={safe})")
+    lines.append(f"   └─ Failed:      {failed:>5}")
+    lines.append(f"   Total: {total}")
 
-        message = "\n".join(lines)
-        return message, stats, True, is_stalled
+    message = "\n".join(lines)
+    return "✅ Database: Connected", message, stats, True, True, is_stalled
 
-    except Exception as e:
-        error_msg = str(e)[:50]
-        return f"🔴 Queue: Failed to fetch stats ({error_msg})", {}, False, False
 
+_nvml_handle = None
 
-def check_gpu() -> tuple[str, bool]:
-    """
-    Check GPU availability and memory.
 
-    Returns:
-        (status_message, is_healthy)
-    """
+def _get_nvml_handle():
+    """Initialize NVML once and cache the handle for GPU 0."""
+    global _nvml_handle
+    if _nvml_handle is None:
+        pynvml.nvmlInit()
+        _nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+    return _nvml_handle
+
+
+def _check_gpu_nvml() -> tuple[str, bool]:
+    """Check GPU via NVML (no subprocess, no CSV parsing)."""
+    handle = _get_nvml_handle()
+
+    name = pynvml.nvmlDeviceGetName(handle)
+    if isinstance(name, bytes):  # Older bindings return bytes
+        name = name.decode()
+    mem = pynvml.nvmlDeviceGetMemoryInfo(handle)
+    util = pynvml.nvmlDeviceGetUtilizationRates(handle).gpu
+
+    mem_used = mem.used // (1024 * 1024)
+    mem_total = mem.total // (1024 * 1024)
+    mem_pct = (mem_used / mem_total) * 100 if mem_total else 0
+    return f"✅ GPU: {name} | {mem_used}/{mem_total} MB ({mem_pct:.0f}%) | Util: {util}%", True
+
+
+def _check_gpu_smi() -> tuple[str, bool]:
+    """Check GPU by parsing nvidia-smi CSV output (fallback path)."""
     try:
         result = subprocess.run(
             ["nvidia-smi", "--query-gpu=name,memory.used,memory.total,utilization.gpu",
@@ -180,6 +260,25 @@ def check_gpu() -> tuple[str, bool]:
         return f"🔴 GPU: Error ({str(e)[:30]})", False
 
 
+def check_gpu() -> tuple[str, bool]:
+    """
+    Check GPU availability and memory.
+
+    Prefers NVML (pynvml) and falls back to nvidia-smi when the bindings
+    are missing or NVML cannot be initialized.
+
+    Returns:
+        (status_message, is_healthy)
+    """
+    if pynvml is not None:
+        try:
+            return _check_gpu_nvml()
+        except Exception:
+            pass  # NVML unavailable (no driver, etc.) - try nvidia-smi
+
+    return _check_gpu_smi()
+
+
 # =============================================================================
 # MAIN
 # =============================================================================
@@ -212,8 +311,28 @@ def main():
         print(f"🔴 CRITICAL: Failed to load settings: {e}")
         sys.exit(1)
 
+    # Build one Supabase client for all checks (single TLS handshake per run)
+    try:
+        client = create_client(
+            settings.supabase_url,
+            settings.supabase_service_role_key,
+            options=ClientOptions(postgrest_client_timeout=DB_TIMEOUT_SECS),
+        )
+        repo = create_repository(client)
+    except Exception as e:
+        print(f"🔴 CRITICAL: Failed to create Supabase client: {e}")
+        sys.exit(1)
+
+    # Run all probes concurrently - they are independent blocking I/O
+    # (pgrep fork, Supabase HTTPS, nvidia-smi fork), so wall time is the
+    # slowest probe rather than the sum. Results are rendered in fixed order.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        workers_future = executor.submit(check_workers)
+        snapshot_future = executor.submit(check_database_and_queue, repo)
+        gpu_future = executor.submit(check_gpu)
+
     # Check 1: Workers
-    worker_msg, worker_count, workers_healthy = check_workers()
+    worker_msg, worker_count, workers_healthy = workers_future.result()
     results["workers"] = {"count": worker_count, "expected": EXPECTED_WORKERS, "healthy": workers_healthy}
     if not json_output:
         print(worker_msg)
@@ -222,8 +341,10 @@ def main():
     elif not workers_healthy:
         is_warning = True
 
+    # Check 2 + 3: Database and Queue (one health_snapshot RPC)
+    db_msg, queue_msg, stats, db_healthy, queue_healthy, is_stalled = snapshot_future.result()
+
     # Check 2: Database
-    db_msg, db_healthy = check_database(settings)
     results["database"] = {"healthy": db_healthy}
     if not json_output:
         print(db_msg)
@@ -231,7 +352,6 @@ def main():
         is_critical = True
 
     # Check 3: Queue
-    queue_msg, stats, queue_healthy, is_stalled = check_queue(settings)
     results["queue"] = {"stats": stats, "healthy": queue_healthy, "stalled": is_stalled}
     if not json_output:
         print(queue_msg)
@@ -241,7 +361,7 @@ def main():
         is_warning = True
 
     # Check 4: GPU
-    gpu_msg, gpu_healthy = check_gpu()
+    gpu_msg, gpu_healthy = gpu_future.result()
     results["gpu"] = {"healthy": gpu_healthy}
     if not json_output:
         print(gpu_msg)
@@ -261,10 +381,12 @@ def main():
 
     # JSON output
     if json_output:
-        import json
         results["timestamp"] = timestamp
         results["status"] = "critical" if is_critical else ("warning" if is_warning else "healthy")
-        print(json.dumps(results, indent=2))
+        # default=str: values from Supabase (e.g. Decimal) are not natively serializable
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(results, default=str, option=orjson.OPT_INDENT_2) + b"\n")
+        sys.stdout.flush()
 
     # Exit code
     if is_critical:
@@ -48,7 +48,7 @@ Type=forking
 User=root
 WorkingDirectory=/workspace
 Environment=PYTHONPATH=/workspace
-Environment=PYTORCH_CUDA_ALLOC_CONF=expandable_segments:True
+Environment=PYTORCH_CUDA_ALLOC_CONF=expandable_segments:True,garbage_collection_threshold:0.8
 
 # Source environment variables
 ExecStartPre=/bin/bash -c 'set -a && source /workspace/.env && set +a'
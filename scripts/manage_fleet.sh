@@ -39,7 +39,7 @@ readonly PID_DIR="/workspace/pids"
 # Without this: Workers crash with "CUDA out of memory" after ~10 transcriptions
 # With this: Workers run stably for 1000+ transcriptions
 # -----------------------------------------------------------------------------
-readonly PYTORCH_MEMORY_FIX="expandable_segments:True"
+readonly PYTORCH_MEMORY_FIX="expandable_segments:True,garbage_collection_threshold:0.8"
 
 # Stagger delay between worker launches (seconds)
 # Prevents thundering herd on model loading
@@ -28,16 +28,18 @@ Non-Recoverable Errors:
 """
 
 import argparse
+import functools
 import os
 import sys
 import re
-from datetime import datetime, timezone
 from collections import Counter
 from pathlib import Path
+from typing import NamedTuple
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from supabase import create_client
+from dotenv import dotenv_values
+from supabase import ClientOptions, create_client
 
 # =============================================================================
 # ERROR PATTERN CLASSIFICATION
@@ -79,6 +81,21 @@ NON_RECOVERABLE_PATTERNS = [
 ]
 
 
+def _compile_alternation(patterns: list[str]) -> re.Pattern:
+    """
+    Compile a pattern list into one case-insensitive alternation.
+
+    Each pattern is wrapped in its own capturing group so the matched
+    pattern can be recovered from `match.lastindex`.
+    """
+    return re.compile("|".join(f"({p})" for p in patterns), re.IGNORECASE)
+
+
+# One regex scan per class instead of one re.search() per pattern
+NON_RECOVERABLE_RE = _compile_alternation(NON_RECOVERABLE_PATTERNS)
+RECOVERABLE_RE = _compile_alternation(RECOVERABLE_PATTERNS)
+
+
 def classify_error(error: str) -> tuple[bool, str]:
     """
     Classify an error as recoverable or not.
@@ -90,19 +107,145 @@ def classify_error(error: str) -> tuple[bool, str]:
         return False, "No error message"
 
     # Check non-recoverable patterns first (takes precedence)
-    for pattern in NON_RECOVERABLE_PATTERNS:
-        if re.search(pattern, error, re.IGNORECASE):
-            return False, f"Matches non-recoverable pattern: {pattern}"
+    match = NON_RECOVERABLE_RE.search(error)
+    if match:
+        pattern = NON_RECOVERABLE_PATTERNS[match.lastindex - 1]
+        return False, f"Matches non-recoverable pattern: {pattern}"
 
     # Check recoverable patterns
-    for pattern in RECOVERABLE_PATTERNS:
-        if re.search(pattern, error, re.IGNORECASE):
-            return True, f"Matches recoverable pattern: {pattern}"
+    match = RECOVERABLE_RE.search(error)
+    if match:
+        pattern = RECOVERABLE_PATTERNS[match.lastindex - 1]
+        return True, f"Matches recoverable pattern: {pattern}"
 
     # Default: not recoverable unless has storage_path
     return False, "No matching pattern"
 
 
+# =============================================================================
+# FETCH / CATEGORIZE / RECOVER
+# =============================================================================
+# Rows per page when scanning failed calls (PostgREST caps responses at 1000)
+PAGE_SIZE = 1000
+
+# Call ids per bulk_recover RPC (keeps request payloads small)
+RECOVER_BATCH_SIZE = 500
+
+# Per-request PostgREST timeout (bounds each page fetch and bulk_recover RPC)
+DB_TIMEOUT_SECS = 30
+
+FAILED_CALL_COLUMNS = "id, processing_error, retry_count, storage_path, audio_url"
+
+# Recovery categories (indexes into the per-category count list)
+STORAGE_RECOVERABLE = 0
+STORAGE_NOT_RECOVERABLE = 1
+AUDIO_URL_RECOVERABLE = 2
+AUDIO_URL_NOT_RECOVERABLE = 3
+NO_AUDIO = 4
+NUM_CATEGORIES = 5
+
+
+def iter_failed_pages(schema, page_size: int = PAGE_SIZE):
+    """
+    Yield failed calls in pages, ordered by id.
+
+    Uses keyset pagination (id > last seen id) rather than offsets, so rows
+    recovered mid-scan (which leave status='failed') cannot shift later
+    pages and cause calls to be skipped.
+
+    Yields:
+        Lists of call dicts (at most page_size each)
+    """
+    last_id = None
+
+    while True:
+        query = schema.from_("calls").select(FAILED_CALL_COLUMNS).eq("status", "failed")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+
+        response = query.order("id").limit(page_size).execute()
+        page = response.data or []
+        if not page:
+            return
+
+        yield page
+
+        if len(page) < page_size:
+            return
+        last_id = page[-1]["id"]
+
+
+class ErrorFlags(NamedTuple):
+    """Everything categorize_call needs to know about an error message."""
+    is_recoverable: bool
+    is_cuda_oom: bool
+    is_zombie_reset: bool
+
+
+@functools.lru_cache(maxsize=4096)
+def error_flags(error: str) -> ErrorFlags:
+    """
+    Classify an error message once.
+
+    Memoized: failed calls repeat a small set of error messages, so most
+    rows skip the regex and substring scans entirely.
+    """
+    is_recoverable, _reason = classify_error(error)
+    return ErrorFlags(
+        is_recoverable=is_recoverable,
+        is_cuda_oom="CUDA out of memory" in error,
+        is_zombie_reset="Zombie reset" in error,
+    )
+
+
+def categorize_call(call: dict, force: bool) -> int:
+    """
+    Assign a failed call to a recovery category.
+
+    Returns:
+        One of: STORAGE_RECOVERABLE, STORAGE_NOT_RECOVERABLE,
+        AUDIO_URL_RECOVERABLE, AUDIO_URL_NOT_RECOVERABLE, NO_AUDIO
+    """
+    error = call.get("processing_error") or ""
+    retry_count = call.get("retry_count") or 0
+    has_storage = bool(call.get("storage_path"))
+    has_audio_url = bool(call.get("audio_url"))
+
+    flags = error_flags(error)
+
+    # storage_path + CUDA OOM is always recoverable, whatever the patterns say
+    is_recoverable = flags.is_recoverable or (has_storage and flags.is_cuda_oom)
+
+    # Check retry count (unless --force); zombie resets are always recoverable
+    if retry_count >= 3 and not force and not flags.is_zombie_reset:
+        is_recoverable = False
+
+    if has_storage:
+        return STORAGE_RECOVERABLE if is_recoverable else STORAGE_NOT_RECOVERABLE
+    if has_audio_url:
+        return AUDIO_URL_RECOVERABLE if is_recoverable else AUDIO_URL_NOT_RECOVERABLE
+    return NO_AUDIO
+
+
+def recover_batch(schema, call_ids: list[str], target_status: str) -> int:
+    """
+    Reset a batch of failed calls with one core.bulk_recover() RPC.
+
+    Args:
+        schema: Supabase "core" schema client
+        call_ids: UUIDs of calls to recover (at most RECOVER_BATCH_SIZE)
+        target_status: 'downloaded' (re-run Factory) or 'pending' (re-run Vault)
+
+    Returns:
+        Number of rows updated
+    """
+    response = schema.rpc("bulk_recover", {
+        "p_ids": call_ids,
+        "p_target": target_status,
+    }).execute()
+    return response.data or 0
+
+
 # =============================================================================
 # MAIN SCRIPT
 # =============================================================================
@@ -137,12 +280,9 @@ def main():
     # Load environment
     env_file = Path(__file__).parent.parent / ".env"
     if env_file.exists():
-        with open(env_file) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith("#") and "=" in line:
-                    key, value = line.split("=", 1)
-                    os.environ.setdefault(key.strip(), value.strip())
+        for key, value in dotenv_values(env_file).items():
+            if value is not None:
+                os.environ.setdefault(key, value)
 
     # Connect to Supabase
     url = os.environ.get("SUPABASE_URL")
@@ -152,7 +292,7 @@ def main():
         print("❌ Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY")
         sys.exit(1)
 
-    client = create_client(url, key)
+    client = create_client(url, key, options=ClientOptions(postgrest_client_timeout=DB_TIMEOUT_SECS))
     schema = client.schema("core")
 
     print("=" * 65)
@@ -165,155 +305,121 @@ def main():
     print("=" * 65)
 
     # ==========================================================================
-    # STEP 1: Fetch and categorize failed calls
+    # STEP 1: Scan failed calls page by page
     # ==========================================================================
-    print("\n[1] Fetching failed calls...")
+    # Each page is categorized (and, with --execute, recovered) before the
+    # next page is fetched, so peak memory is bounded by PAGE_SIZE.
+    print(f"\n[1] Scanning failed calls (pages of {PAGE_SIZE})...")
 
-    response = schema.from_("calls").select(
-        "id, processing_error, retry_count, storage_path, audio_url"
-    ).eq("status", "failed").execute()
+    recover_categories = {STORAGE_RECOVERABLE}
+    if not args.storage_only:
+        recover_categories.add(AUDIO_URL_RECOVERABLE)
 
-    failed_calls = response.data or []
-    print(f"    Total failed: {len(failed_calls)}")
+    category_counts = [0] * NUM_CATEGORIES
+    error_counts = Counter()
+    total_failed = 0
 
-    if not failed_calls:
+    selected = 0  # Calls chosen for recovery (respects --limit)
+    recovered = 0
+    errors = 0
+    status_counts = Counter()  # Target status of recovered calls
+
+    for page_num, page in enumerate(iter_failed_pages(schema), start=1):
+        total_failed += len(page)
+        # Target status -> call ids selected for recovery on this page
+        page_targets = {"downloaded": [], "pending": []}
+
+        # Track error patterns (one C-level Counter.update per page)
+        error_counts.update(
+            (call.get("processing_error") or "")[:50] or "No error"
+            for call in page
+        )
+
+        for call in page:
+            category = categorize_call(call, args.force)
+            category_counts[category] += 1
+
+            if category not in recover_categories:
+                continue
+            if args.limit > 0 and selected >= args.limit:
+                continue
+            selected += 1
+
+            # Has storage_path → re-run Factory; audio_url only → re-run Vault
+            target = "downloaded" if call.get("storage_path") else "pending"
+            page_targets[target].append(call["id"])
+
+        if not args.execute:
+            print(f"    Page {page_num}: {len(page)} calls")
+            continue
+
+        page_recovered = 0
+        for target, call_ids in page_targets.items():
+            for i in range(0, len(call_ids), RECOVER_BATCH_SIZE):
+                batch = call_ids[i:i + RECOVER_BATCH_SIZE]
+                try:
+                    count = recover_batch(schema, batch, target)
+                    status_counts[target] += count
+                    page_recovered += count
+                except Exception as e:
+                    errors += len(batch)
+                    print(f"    ❌ Error recovering {len(batch)} calls → '{target}': {e}")
+
+        recovered += page_recovered
+        print(f"    Page {page_num}: {len(page)} calls, {page_recovered} recovered")
+
+    print(f"    Total failed: {total_failed}")
+
+    if total_failed == 0:
         print("\n✅ No failed calls to recover!")
         return
 
     # ==========================================================================
-    # STEP 2: Categorize by recovery potential
-    # ==========================================================================
-    print("\n[2] Categorizing calls...")
-
-    # Categories
-    with_storage_recoverable = []
-    with_storage_not_recoverable = []
-    with_audio_url_recoverable = []
-    with_audio_url_not_recoverable = []
-    no_audio = []
-
-    error_counts = Counter()
-
-    for call in failed_calls:
-        error = call.get("processing_error") or ""
-        retry_count = call.get("retry_count") or 0
-        has_storage = bool(call.get("storage_path"))
-        has_audio_url = bool(call.get("audio_url"))
-
-        # Track error patterns
-        error_short = error[:50] if error else "No error"
-        error_counts[error_short] += 1
-
-        # Classify
-        is_recoverable, reason = classify_error(error)
-
-        # Override: if has storage_path and CUDA OOM, always recoverable
-        if has_storage and "CUDA out of memory" in error:
-            is_recoverable = True
-
-        # Check retry count (unless --force)
-        if retry_count >= 3 and not args.force:
-            # Check if zombie reset - those are always recoverable
-            if "Zombie reset" not in error:
-                is_recoverable = False
-
-        # Categorize
-        if has_storage:
-            if is_recoverable:
-                with_storage_recoverable.append(call)
-            else:
-                with_storage_not_recoverable.append(call)
-        elif has_audio_url:
-            if is_recoverable:
-                with_audio_url_recoverable.append(call)
-            else:
-                with_audio_url_not_recoverable.append(call)
-        else:
-            no_audio.append(call)
-
-    # ==========================================================================
-    # STEP 3: Report analysis
+    # STEP 2: Report analysis
     # ==========================================================================
-    print("\n[3] Analysis Results")
-    print("-" * 50)
-    print(f"    WITH storage_path:")
-    print(f"      ✅ Recoverable:     {len(with_storage_recoverable)}")
-    print(f"      ❌ Not recoverable: {len(with_storage_not_recoverable)}")
-    print(f"    WITH audio_url only:")
-    print(f"      ✅ Recoverable:     {len(with_audio_url_recoverable)}")
-    print(f"      ❌ Not recoverable: {len(with_audio_url_not_recoverable)}")
-    print(f"    NO audio:")
-    print(f"      ❌ Unrecoverable:   {len(no_audio)}")
-    print("-" * 50)
-
-    total_recoverable = len(with_storage_recoverable)
-    if not args.storage_only:
-        total_recoverable += len(with_audio_url_recoverable)
-
-    print(f"    TOTAL RECOVERABLE:   {total_recoverable}")
-
-    print(f"\n[4] Error Pattern Summary (Top 10)")
-    print("-" * 50)
-    for error, count in error_counts.most_common(10):
-        print(f"    [{count:>4}x] {error}...")
+    total_recoverable = sum(category_counts[c] for c in recover_categories)
+
+    # Render each report block as one write instead of a print per line
+    sys.stdout.write("".join([
+        "\n[2] Analysis Results\n",
+        "-" * 50 + "\n",
+        "    WITH storage_path:\n",
+        f"      ✅ Recoverable:     {category_counts[STORAGE_RECOVERABLE]}\n",
+        f"      ❌ Not recoverable: {category_counts[STORAGE_NOT_RECOVERABLE]}\n",
+        "    WITH audio_url only:\n",
+        f"      ✅ Recoverable:     {category_counts[AUDIO_URL_RECOVERABLE]}\n",
+        f"      ❌ Not recoverable: {category_counts[AUDIO_URL_NOT_RECOVERABLE]}\n",
+        "    NO audio:\n",
+        f"      ❌ Unrecoverable:   {category_counts[NO_AUDIO]}\n",
+        "-" * 50 + "\n",
+        f"    TOTAL RECOVERABLE:   {total_recoverable}\n",
+    ]))
+
+    parts = ["\n[3] Error Pattern Summary (Top 10)\n", "-" * 50 + "\n"]
+    parts.extend(f"    [{count:>4}x] {error}...\n" for error, count in error_counts.most_common(10))
+    sys.stdout.write("".join(parts))
 
     # ==========================================================================
-    # STEP 4: Execute recovery
+    # STEP 4: Recovery results
     # ==========================================================================
     if total_recoverable == 0:
         print("\n⚠️  No recoverable calls found")
         return
 
-    # Build list of calls to recover
-    to_recover = with_storage_recoverable[:]
-    if not args.storage_only:
-        to_recover.extend(with_audio_url_recoverable)
-
-    # Apply limit
     if args.limit > 0:
-        to_recover = to_recover[:args.limit]
         print(f"\n    (Limited to {args.limit} calls)")
 
     if not args.execute:
-        print(f"\n[5] DRY RUN - No changes made")
-        print(f"    Would recover {len(to_recover)} calls")
+        print(f"\n[4] DRY RUN - No changes made")
+        print(f"    Would recover {selected} calls")
         print(f"\n    To execute, run:")
         print(f"    python scripts/recover_failed.py --execute")
         if args.storage_only:
             print(f"    python scripts/recover_failed.py --execute --storage-only")
         return
 
-    print(f"\n[5] EXECUTING RECOVERY ({len(to_recover)} calls)")
+    print(f"\n[4] RECOVERY EXECUTED ({selected} calls)")
     print("-" * 50)
-
-    recovered = 0
-    errors = 0
-
-    for call in to_recover:
-        try:
-            # Determine target status
-            if call.get("storage_path"):
-                new_status = "downloaded"  # Re-run Factory
-            else:
-                new_status = "pending"  # Re-run Vault first
-
-            # Update call
-            schema.from_("calls").update({
-                "status": new_status,
-                "retry_count": 0,
-                "processing_error": f"[Recovered {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M')}] {call.get('processing_error', '')[:200]}",
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-            }).eq("id", call["id"]).execute()
-
-            recovered += 1
-
-            if recovered % 50 == 0:
-                print(f"    Progress: {recovered}/{len(to_recover)}")
-
-        except Exception as e:
-            errors += 1
-            print(f"    ❌ Error on {call['id'][:8]}: {e}")
-
     print(f"\n    ✅ Recovered: {recovered}")
     print(f"    ❌ Errors: {errors}")
 
@@ -325,12 +431,8 @@ def main():
     print("=" * 65)
     print(f"\n  Calls recovered: {recovered}")
     print(f"  Target status breakdown:")
-
-    downloaded_count = sum(1 for c in to_recover[:recovered] if c.get("storage_path"))
-    pending_count = recovered - downloaded_count
-
-    print(f"    → 'downloaded' (Factory): {downloaded_count}")
-    print(f"    → 'pending' (Vault):      {pending_count}")
+    print(f"    → 'downloaded' (Factory): {status_counts['downloaded']}")
+    print(f"    → 'pending' (Vault):      {status_counts['pending']}")
     print(f"\n  These calls will be processed by the running workers.")
     print("")
 
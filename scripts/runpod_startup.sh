@@ -84,7 +84,7 @@ set +a
 
 # Export required vars
 export PYTHONPATH=/workspace
-export PYTORCH_CUDA_ALLOC_CONF="expandable_segments:True"
+export PYTORCH_CUDA_ALLOC_CONF="expandable_segments:True,garbage_collection_threshold:0.8"
 
 # Start fleet
 bash "$FLEET_MANAGER" start >> "$LOG_FILE" 2>&1
@@ -13,12 +13,17 @@ Tests:
 1. Concurrent lock acquisition (only one worker wins)
 2. Transient failure with lock release
 3. Permanent error (404) leads to status='failed'
+4. Zombie cleanup releases stale locks
+
+State changes are verified from the rows returned by each UPDATE; only
+test 4 re-reads the call, since the zombie RPC changes it server-side.
 """
 
+import io
 import os
 import sys
+import threading
 import time
-import uuid
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
@@ -49,50 +54,40 @@ schema = client.schema("core")
 TEST_ORG_ID = "00000000-0000-0000-0000-000000000001"
 
 
-def create_test_call() -> str:
-    """Create a test call in pending status for locking tests."""
-    call_id = str(uuid.uuid4())
-    ringba_id = f"TEST-{call_id[:8]}"
+def create_test_calls(count: int) -> list[str]:
+    """Create `count` pending test calls in one RPC and return their ids."""
+    result = client.rpc(
+        "bulk_create_test_calls",
+        {"p_count": count, "p_org_id": TEST_ORG_ID},
+        schema="core",
+    ).execute()
 
-    schema.from_("calls").insert({
-        "id": call_id,
-        "ringba_call_id": ringba_id,
-        "org_id": TEST_ORG_ID,
-        "status": "pending",
-        "audio_url": "https://example.com/test.mp3",
-        "storage_path": None,
-        "start_time_utc": datetime.now(timezone.utc).isoformat(),
-    }).execute()
+    call_ids = result.data or []
+    print(f"  Created {len(call_ids)} test calls")
+    return call_ids
 
-    print(f"  Created test call: {call_id[:8]}...")
-    return call_id
 
+def cleanup_test_calls(call_ids: list[str]) -> None:
+    """
+    Delete all test calls in one RPC.
 
-def cleanup_test_call(call_id: str) -> None:
-    """Delete a test call."""
-    schema.from_("calls").delete().eq("id", call_id).execute()
-    print(f"  Cleaned up: {call_id[:8]}...")
+    Runs from main()'s finally block, so failures are reported rather than
+    raised - they must not mask the test results or the original error.
+    """
+    try:
+        result = client.rpc("bulk_cleanup_test_calls", {"p_ids": call_ids}, schema="core").execute()
+        print(f"  Cleaned up {result.data} test calls")
+    except Exception as e:
+        print(f"  ⚠️  Cleanup failed for {len(call_ids)} test calls: {e}")
+        print(f"     Remove leftovers with ringba_call_id LIKE 'TEST-%'")
 
 
 def attempt_lock(call_id: str, worker_id: int) -> tuple[int, bool]:
     """
-    Attempt to acquire lock on a call.
+    Attempt to acquire lock on a call (same RPC as the Vault worker).
     Returns (worker_id, success).
     """
-    lock_value = f"vault_lock:{call_id[:8]}"
-
-    response = (
-        schema
-        .from_("calls")
-        .update({
-            "storage_path": lock_value,
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        })
-        .eq("id", call_id)
-        .eq("status", "pending")
-        .is_("storage_path", "null")
-        .execute()
-    )
+    response = client.rpc("acquire_vault_lock", {"p_call_id": call_id}, schema="core").execute()
 
     success = bool(response.data)
     return (worker_id, success)
@@ -101,7 +96,7 @@ def attempt_lock(call_id: str, worker_id: int) -> tuple[int, bool]:
 # =============================================================================
 # TEST 1: Concurrent Lock Acquisition
 # =============================================================================
-def test_concurrent_lock():
+def test_concurrent_lock(call_id: str):
     """
     Test that only one worker can acquire the lock when multiple
     workers attempt concurrently.
@@ -110,47 +105,41 @@ def test_concurrent_lock():
     print("TEST 1: Concurrent Lock Acquisition")
     print("=" * 60)
 
-    call_id = create_test_call()
+    # Launch 5 workers attempting to lock simultaneously
+    num_workers = 5
+    print(f"  Launching {num_workers} concurrent lock attempts...")
 
-    try:
-        # Launch 5 workers attempting to lock simultaneously
-        num_workers = 5
-        print(f"  Launching {num_workers} concurrent lock attempts...")
-
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            futures = [
-                executor.submit(attempt_lock, call_id, i)
-                for i in range(num_workers)
-            ]
-
-            results = []
-            for future in as_completed(futures):
-                results.append(future.result())
-
-        # Count successes
-        successes = [r for r in results if r[1]]
-        failures = [r for r in results if not r[1]]
-
-        print(f"\n  Results:")
-        print(f"    Successes: {len(successes)} (workers: {[r[0] for r in successes]})")
-        print(f"    Failures:  {len(failures)} (workers: {[r[0] for r in failures]})")
-
-        # Verify exactly one success
-        if len(successes) == 1:
-            print("\n  ✅ PASS: Exactly one worker acquired the lock")
-            return True
-        else:
-            print(f"\n  ❌ FAIL: Expected 1 success, got {len(successes)}")
-            return False
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = [
+            executor.submit(attempt_lock, call_id, i)
+            for i in range(num_workers)
+        ]
 
-    finally:
-        cleanup_test_call(call_id)
+        results = []
+        for future in as_completed(futures):
+            results.append(future.result())
+
+    # Count successes
+    successes = [r for r in results if r[1]]
+    failures = [r for r in results if not r[1]]
+
+    print(f"\n  Results:")
+    print(f"    Successes: {len(successes)} (workers: {[r[0] for r in successes]})")
+    print(f"    Failures:  {len(failures)} (workers: {[r[0] for r in failures]})")
+
+    # Verify exactly one success
+    if len(successes) == 1:
+        print("\n  ✅ PASS: Exactly one worker acquired the lock")
+        return True
+    else:
+        print(f"\n  ❌ FAIL: Expected 1 success, got {len(successes)}")
+        return False
 
 
 # =============================================================================
 # TEST 2: Transient Failure Lock Release
 # =============================================================================
-def test_transient_failure_lock_release():
+def test_transient_failure_lock_release(call_id: str):
     """
     Test that lock is released when a transient error occurs.
     Simulates a download failure mid-processing.
@@ -159,51 +148,46 @@ def test_transient_failure_lock_release():
     print("TEST 2: Transient Failure Lock Release")
     print("=" * 60)
 
-    call_id = create_test_call()
-
-    try:
-        # Step 1: Acquire lock
-        lock_value = f"vault_lock:{call_id[:8]}"
-        schema.from_("calls").update({
-            "storage_path": lock_value,
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }).eq("id", call_id).execute()
-
-        print(f"  Lock acquired: storage_path = '{lock_value}'")
+    # One timestamp for every update in this test
+    now = datetime.now(timezone.utc).isoformat()
 
-        # Step 2: Verify lock is set
-        call = schema.from_("calls").select("storage_path, status").eq("id", call_id).single().execute()
-        assert call.data["storage_path"] == lock_value, "Lock not set"
-        assert call.data["status"] == "pending", "Status should still be pending"
-        print(f"  Verified: status={call.data['status']}, storage_path={call.data['storage_path']}")
+    # Step 1: Acquire lock (the update returns the updated row, so the
+    # verification below needs no separate SELECT)
+    lock_value = f"vault_lock:{call_id[:8]}"
+    call = schema.from_("calls").update({
+        "storage_path": lock_value,
+        "updated_at": now,
+    }).eq("id", call_id).execute().data[0]
 
-        # Step 3: Simulate transient failure - release lock
-        schema.from_("calls").update({
-            "storage_path": None,
-            "processing_error": "Simulated transient error",
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }).eq("id", call_id).execute()
+    print(f"  Lock acquired: storage_path = '{lock_value}'")
 
-        print("  Simulated transient failure, released lock")
+    # Step 2: Verify lock is set
+    assert call["storage_path"] == lock_value, "Lock not set"
+    assert call["status"] == "pending", "Status should still be pending"
+    print(f"  Verified: status={call['status']}, storage_path={call['storage_path']}")
 
-        # Step 4: Verify lock released, status still pending
-        call = schema.from_("calls").select("storage_path, status, processing_error").eq("id", call_id).single().execute()
+    # Step 3: Simulate transient failure - release lock
+    call = schema.from_("calls").update({
+        "storage_path": None,
+        "processing_error": "Simulated transient error",
+        "updated_at": now,
+    }).eq("id", call_id).execute().data[0]
 
-        if call.data["storage_path"] is None and call.data["status"] == "pending":
-            print(f"\n  ✅ PASS: Lock released, status='pending', error='{call.data['processing_error']}'")
-            return True
-        else:
-            print(f"\n  ❌ FAIL: storage_path={call.data['storage_path']}, status={call.data['status']}")
-            return False
+    print("  Simulated transient failure, released lock")
 
-    finally:
-        cleanup_test_call(call_id)
+    # Step 4: Verify lock released, status still pending
+    if call["storage_path"] is None and call["status"] == "pending":
+        print(f"\n  ✅ PASS: Lock released, status='pending', error='{call['processing_error']}'")
+        return True
+    else:
+        print(f"\n  ❌ FAIL: storage_path={call['storage_path']}, status={call['status']}")
+        return False
 
 
 # =============================================================================
 # TEST 3: Permanent Error (404)
 # =============================================================================
-def test_permanent_error_404():
+def test_permanent_error_404(call_id: str):
     """
     Test that permanent errors (404/403/410) result in status='failed'.
     """
@@ -211,48 +195,43 @@ def test_permanent_error_404():
     print("TEST 3: Permanent Error (404) Handling")
     print("=" * 60)
 
-    call_id = create_test_call()
-
-    try:
-        # Step 1: Acquire lock
-        lock_value = f"vault_lock:{call_id[:8]}"
-        schema.from_("calls").update({
-            "storage_path": lock_value,
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }).eq("id", call_id).execute()
-
-        print(f"  Lock acquired: storage_path = '{lock_value}'")
-
-        # Step 2: Simulate permanent failure (404)
-        # This mimics what the Vault worker does on 404
-        schema.from_("calls").update({
-            "storage_path": None,
-            "status": "failed",
-            "processing_error": "Audio URL expired or unavailable (HTTP 404)",
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }).eq("id", call_id).execute()
-
-        print("  Simulated 404 error")
+    # One timestamp for every update in this test
+    now = datetime.now(timezone.utc).isoformat()
 
-        # Step 3: Verify status='failed', lock released
-        call = schema.from_("calls").select("storage_path, status, processing_error").eq("id", call_id).single().execute()
+    # Step 1: Acquire lock
+    lock_value = f"vault_lock:{call_id[:8]}"
+    schema.from_("calls").update({
+        "storage_path": lock_value,
+        "updated_at": now,
+    }).eq("id", call_id).execute()
 
-        if call.data["status"] == "failed" and call.data["storage_path"] is None:
-            print(f"\n  ✅ PASS: status='failed', storage_path=NULL")
-            print(f"           processing_error='{call.data['processing_error']}'")
-            return True
-        else:
-            print(f"\n  ❌ FAIL: status={call.data['status']}, storage_path={call.data['storage_path']}")
-            return False
+    print(f"  Lock acquired: storage_path = '{lock_value}'")
 
-    finally:
-        cleanup_test_call(call_id)
+    # Step 2: Simulate permanent failure (404)
+    # This mimics what the Vault worker does on 404
+    call = schema.from_("calls").update({
+        "storage_path": None,
+        "status": "failed",
+        "processing_error": "Audio URL expired or unavailable (HTTP 404)",
+        "updated_at": now,
+    }).eq("id", call_id).execute().data[0]
+
+    print("  Simulated 404 error")
+
+    # Step 3: Verify status='failed', lock released (from the returned row)
+    if call["status"] == "failed" and call["storage_path"] is None:
+        print(f"\n  ✅ PASS: status='failed', storage_path=NULL")
+        print(f"           processing_error='{call['processing_error']}'")
+        return True
+    else:
+        print(f"\n  ❌ FAIL: status={call['status']}, storage_path={call['storage_path']}")
+        return False
 
 
 # =============================================================================
 # TEST 4: Zombie Cleanup (Stale Lock)
 # =============================================================================
-def test_zombie_cleanup():
+def test_zombie_cleanup(call_id: str):
     """
     Test that the zombie killer releases stale locks.
     Creates a lock backdated >30 minutes and runs cleanup.
@@ -261,22 +240,19 @@ def test_zombie_cleanup():
     print("TEST 4: Zombie Cleanup (Stale Lock)")
     print("=" * 60)
 
-    call_id = create_test_call()
-
     try:
         # Step 1: Create stale lock (backdate updated_at by 31 minutes)
         lock_value = f"vault_lock:{call_id[:8]}"
-        schema.from_("calls").update({
+        call = schema.from_("calls").update({
             "storage_path": lock_value,
             "updated_at": "2020-01-01T00:00:00Z",  # Very old timestamp
-        }).eq("id", call_id).execute()
+        }).eq("id", call_id).execute().data[0]
 
         print(f"  Created stale lock: storage_path = '{lock_value}'")
         print(f"  Backdated updated_at to 2020-01-01")
 
-        # Step 2: Verify lock is set
-        call = schema.from_("calls").select("storage_path").eq("id", call_id).single().execute()
-        assert call.data["storage_path"] == lock_value, "Lock not set"
+        # Step 2: Verify lock is set (from the returned row)
+        assert call["storage_path"] == lock_value, "Lock not set"
 
         # Step 3: Call zombie cleanup function
         print("  Calling core.release_stale_vault_locks(30)...")
@@ -299,13 +275,39 @@ def test_zombie_cleanup():
         print(f"\n  ⚠️  SKIP: Zombie function may not be deployed yet: {e}")
         return None
 
-    finally:
-        cleanup_test_call(call_id)
-
 
 # =============================================================================
 # MAIN
 # =============================================================================
+class _PerThreadStdout:
+    """
+    sys.stdout proxy that sends writes to a per-thread buffer when one is set.
+
+    Lets tests run concurrently while each test's output is still printed
+    as one contiguous block.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def capture(self) -> io.StringIO:
+        self._local.buffer = io.StringIO()
+        return self._local.buffer
+
+    def write(self, text: str) -> int:
+        return getattr(self._local, "buffer", self._stream).write(text)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+def run_captured(stdout: _PerThreadStdout, test_fn, call_id: str):
+    """Run one test with its output buffered. Returns (result, output)."""
+    buffer = stdout.capture()
+    return test_fn(call_id), buffer.getvalue()
+
+
 def main():
     print("\n" + "=" * 60)
     print("VAULT LOCKING VERIFICATION TESTS")
@@ -314,12 +316,39 @@ def main():
     print(f"Schema: core.calls")
 
     results = {}
+    tests = [
+        ("concurrent_lock", test_concurrent_lock),
+        ("transient_failure", test_transient_failure_lock_release),
+        ("permanent_error", test_permanent_error_404),
+    ]
+
+    # One fixture call per test (+ zombie test), created and cleaned up in bulk
+    call_ids = create_test_calls(len(tests) + 1)
+    zombie_call_id = call_ids[-1]
+
+    # Tests 1-3 each use their own call, so run them concurrently; output is
+    # buffered per test and printed in the original order.
+    real_stdout = sys.stdout
+    stdout = _PerThreadStdout(real_stdout)
+    sys.stdout = stdout
 
-    # Run tests
-    results["concurrent_lock"] = test_concurrent_lock()
-    results["transient_failure"] = test_transient_failure_lock_release()
-    results["permanent_error"] = test_permanent_error_404()
-    results["zombie_cleanup"] = test_zombie_cleanup()
+    try:
+        with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+            futures = {
+                name: executor.submit(run_captured, stdout, test_fn, call_id)
+                for (name, test_fn), call_id in zip(tests, call_ids)
+            }
+
+        sys.stdout = real_stdout
+        for name, future in futures.items():
+            results[name], output = future.result()
+            sys.stdout.write(output)
+
+        # Zombie cleanup is global (releases every stale lock), so run it last
+        results["zombie_cleanup"] = test_zombie_cleanup(zombie_call_id)
+    finally:
+        sys.stdout = real_stdout
+        cleanup_test_calls(call_ids)
 
     # Summary
     print("\n" + "=" * 60)
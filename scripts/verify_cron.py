@@ -10,6 +10,7 @@ Usage:
 
 import os
 import sys
+from dataclasses import dataclass
 from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -19,34 +20,49 @@ load_dotenv()
 
 from supabase import create_client
 
+
+@dataclass(slots=True, frozen=True)
+class ExpectedJob:
+    """A pg_cron job the pipeline depends on."""
+    name: str
+    schedule: str
+    description: str
+    critical: bool
+
+
 # Expected cron jobs
-EXPECTED_JOBS = {
-    "core_zombie_killer": {
-        "schedule": "*/30 * * * *",
-        "description": "Reset stuck processing calls (every 30 min)",
-        "critical": True,
-    },
-    "sync_ringba_realtime": {
-        "schedule": "*/5 * * * *",
-        "description": "Ingest Lane - sync calls from Ringba (every 5 min)",
-        "critical": True,
-    },
-    "vault_recording_watcher": {
-        "schedule": "*/2 * * * *",
-        "description": "Vault Lane - download audio to storage (every 2 min)",
-        "critical": True,
-    },
-    "queue_alert_check": {
-        "schedule": "*/15 * * * *",
-        "description": "Queue backup alerts (every 15 min)",
-        "critical": False,
-    },
-    "stall_detection": {
-        "schedule": "15,45 * * * *",
-        "description": "Pipeline stall detection (every 30 min offset)",
-        "critical": False,
-    },
-}
+EXPECTED_JOBS: tuple[ExpectedJob, ...] = (
+    ExpectedJob(
+        name="core_zombie_killer",
+        schedule="*/30 * * * *",
+        description="Reset stuck processing calls (every 30 min)",
+        critical=True,
+    ),
+    ExpectedJob(
+        name="sync_ringba_realtime",
+        schedule="*/5 * * * *",
+        description="Ingest Lane - sync calls from Ringba (every 5 min)",
+        critical=True,
+    ),
+    ExpectedJob(
+        name="vault_recording_watcher",
+        schedule="*/2 * * * *",
+        description="Vault Lane - download audio to storage (every 2 min)",
+        critical=True,
+    ),
+    ExpectedJob(
+        name="queue_alert_check",
+        schedule="*/15 * * * *",
+        description="Queue backup alerts (every 15 min)",
+        critical=False,
+    ),
+    ExpectedJob(
+        name="stall_detection",
+        schedule="15,45 * * * *",
+        description="Pipeline stall detection (every 30 min offset)",
+        critical=False,
+    ),
+)
 
 
 def main():
@@ -94,9 +110,9 @@ def main():
         print("    1. Go to Supabase Dashboard -> SQL Editor")
         print("    2. Run: SELECT * FROM cron.job;")
         print("    3. Verify these jobs exist:")
-        for name, info in EXPECTED_JOBS.items():
-            critical = "[CRITICAL]" if info["critical"] else ""
-            print(f"       - {name} ({info['schedule']}) {critical}")
+        for expected in EXPECTED_JOBS:
+            critical = "[CRITICAL]" if expected.critical else ""
+            print(f"       - {expected.name} ({expected.schedule}) {critical}")
         print()
 
         # Show migration files to run
@@ -111,47 +127,47 @@ def main():
     print(f"\n[2] Found {len(jobs)} cron jobs")
     print("-" * 65)
 
-    found_jobs = {}
-    for job in jobs:
-        name = job.get("jobname", "unknown")
-        schedule = job.get("schedule", "?")
-        active = job.get("active", False)
-        found_jobs[name] = {
-            "schedule": schedule,
-            "active": active,
-        }
-
-    # Compare with expected
-    print("\n[3] Verification Results")
-    print("-" * 65)
+    # jobname -> (schedule, active)
+    found_jobs = {
+        job.get("jobname", "unknown"): (job.get("schedule", "?"), job.get("active", False))
+        for job in jobs
+    }
+
+    # Compare with expected (results rendered into one buffer, written once)
+    out: list[str] = ["\n[3] Verification Results", "-" * 65]
 
     missing = []
     misconfigured = []
     inactive = []
 
-    for name, expected in EXPECTED_JOBS.items():
+    for expected in EXPECTED_JOBS:
+        name = expected.name
         found = found_jobs.get(name)
 
         if not found:
             status = "MISSING"
-            emoji = "🔴" if expected["critical"] else "⚠️"
+            emoji = "🔴" if expected.critical else "⚠️"
             missing.append(name)
-        elif not found["active"]:
-            status = "INACTIVE"
-            emoji = "⚠️"
-            inactive.append(name)
-        elif found["schedule"] != expected["schedule"]:
-            status = f"WRONG SCHEDULE ({found['schedule']})"
-            emoji = "⚠️"
-            misconfigured.append(name)
         else:
-            status = "OK"
-            emoji = "✅"
-
-        critical = "[CRITICAL]" if expected["critical"] else ""
-        print(f"    {emoji} {name}: {status} {critical}")
-        print(f"       Expected: {expected['schedule']} - {expected['description']}")
-        print()
+            schedule, active = found
+            if not active:
+                status = "INACTIVE"
+                emoji = "⚠️"
+                inactive.append(name)
+            elif schedule != expected.schedule:
+                status = f"WRONG SCHEDULE ({schedule})"
+                emoji = "⚠️"
+                misconfigured.append(name)
+            else:
+                status = "OK"
+                emoji = "✅"
+
+        critical = "[CRITICAL]" if expected.critical else ""
+        out.append(f"    {emoji} {name}: {status} {critical}")
+        out.append(f"       Expected: {expected.schedule} - {expected.description}")
+        out.append("")
+
+    sys.stdout.write("\n".join(out) + "\n")
 
     # Summary
     print("=" * 65)
@@ -7,8 +7,8 @@ Proves each lane is working with concrete evidence.
 import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from collections import Counter
 
 sys.path.insert(0, "/workspace")
 
@@ -17,255 +17,320 @@ load_dotenv("/workspace/.env")
 
 from supabase import create_client
 
+from workers.core.db import use_pooled_transport
+
+STATUSES = ["pending", "downloaded", "processing", "transcribed", "flagged", "safe", "failed"]
+
+
+# =============================================================================
+# DATA FETCHERS
+# =============================================================================
+# Each fetcher is one independent read (Supabase query or pgrep), so main()
+# runs them concurrently and renders the sections afterwards in order.
+
+def fetch_status_counts(schema) -> dict:
+    """Status counts plus stuck-job count (>30 min) from one RPC."""
+    stuck_cutoff = (datetime.now(timezone.utc) - timedelta(minutes=30)).isoformat()
+    result = schema.rpc("get_status_counts", {"p_stuck_cutoff": stuck_cutoff}).execute()
+    return result.data or {}
+
+
+# Worker kind -> script path suffix identifying its process
+WORKER_SCRIPTS = {
+    "factory": "workers/factory/worker.py",
+    "vault": "vault/worker.py",
+    "judge": "judge/worker.py",
+}
+
+# Byte-encoded once for the /proc walk: literal suffix checks on raw cmdline
+# bytes need no regex and no decoding
+_WORKER_SCRIPT_BYTES = tuple((kind, script.encode()) for kind, script in WORKER_SCRIPTS.items())
+
+
+def count_process(pattern: str, flags: str = "-fc") -> int:
+    """Count processes matching pattern via pgrep (0 on any failure)."""
+    try:
+        result = subprocess.run(
+            ["pgrep", flags, pattern],
+            capture_output=True, text=True
+        )
+        return int(result.stdout.strip()) if result.returncode == 0 else 0
+    except:
+        return 0
+
+
+def count_workers() -> dict[str, int]:
+    """
+    Count python worker processes of each kind in one pass over /proc.
+
+    A process counts when argv[0] is a python interpreter and one of its
+    arguments ends with the worker's script path. Falls back to one pgrep
+    per kind where /proc is unavailable.
+    """
+    if not os.path.isdir("/proc"):
+        return {kind: count_process(f"python3.*{script}") for kind, script in WORKER_SCRIPTS.items()}
+
+    counts = dict.fromkeys(WORKER_SCRIPTS, 0)
+    own_pid = str(os.getpid())
+
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit() or pid == own_pid:
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                args = f.read().split(b"\0")
+        except OSError:
+            continue  # Process exited mid-scan or is not readable
+
+        if not os.path.basename(args[0]).startswith(b"python"):
+            continue
+        for kind, script in _WORKER_SCRIPT_BYTES:
+            if any(arg.endswith(script) for arg in args[1:]):
+                counts[kind] += 1
+                break
+
+    return counts
+
+
+def fetch_pending_sample(schema) -> list:
+    return schema.from_("calls").select(
+        "id, audio_url, start_time_utc"
+    ).eq("status", "pending").order("start_time_utc", desc=False).limit(10).execute().data or []
+
+
+def fetch_downloaded_sample(schema) -> list:
+    return schema.from_("calls").select(
+        "id, storage_path, retry_count, start_time_utc"
+    ).eq("status", "downloaded").lt("retry_count", 3).order("start_time_utc", desc=True).limit(10).execute().data or []
+
+
+def fetch_transcribed_sample(schema) -> list:
+    return schema.from_("calls").select(
+        "id, transcript_text"
+    ).eq("status", "transcribed").is_("qa_flags", "null").limit(5).execute().data or []
+
+
+def fetch_top_errors(schema) -> list:
+    """Top 5 failed-call error prefixes with counts, grouped server-side."""
+    return schema.rpc("top_failed_errors", {"p_limit": 5}).execute().data or []
+
+
+def fetch_recent_activity(schema) -> dict:
+    """Transcribed/flagged/safe counts for the last hour from one RPC."""
+    one_hour_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    result = schema.rpc("recent_activity", {"p_since": one_hour_ago}).execute()
+    return result.data or {}
+
+
 def main():
     client = create_client(
         os.getenv("SUPABASE_URL"),
         os.getenv("SUPABASE_SERVICE_ROLE_KEY")
     )
     schema = client.schema("core")
+    # All fetchers share the one PostgREST session; with HTTP/2 their
+    # concurrent requests multiplex over a single TLS connection
+    use_pooled_transport(schema)
 
     print("=" * 65)
     print("  CALLSCRIPT V2 - FULL SYSTEM VERIFICATION")
     print("  " + datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC"))
     print("=" * 65)
 
+    # Issue every read at once; wall time is the slowest query, not the sum.
+    # Kept at 8 workers to avoid piling in-flight queries onto the database.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {
+            "counts": executor.submit(fetch_status_counts, schema),
+            "workers": executor.submit(count_workers),
+            "pending": executor.submit(fetch_pending_sample, schema),
+            "downloaded": executor.submit(fetch_downloaded_sample, schema),
+            "transcribed": executor.submit(fetch_transcribed_sample, schema),
+            "errors": executor.submit(fetch_top_errors, schema),
+            "recent": executor.submit(fetch_recent_activity, schema),
+        }
+
+    # Render every section into one buffer and write it once at the end
+    out: list[str] = []
+
     # =========================================================================
     # 1. QUEUE STATUS
     # =========================================================================
-    print("\n[1] QUEUE STATUS (Exact Counts)")
-    print("-" * 50)
+    out.append("\n[1] QUEUE STATUS (Exact Counts)")
+    out.append("-" * 50)
 
-    statuses = ["pending", "downloaded", "processing", "transcribed", "flagged", "safe", "failed"]
-    counts = {}
-    total = 0
+    # One RPC returns every status count plus the stuck-job count used in [10]
+    status_counts = futures["counts"].result()
 
-    for s in statuses:
-        result = schema.from_("calls").select("id", count="exact").eq("status", s).execute()
-        count = result.count or 0
-        counts[s] = count
-        total += count
-        print(f"  {s:12}: {count:>6}")
+    counts = {s: status_counts.get(s, 0) for s in STATUSES}
+    total = sum(counts.values())
 
-    print(f"  {'TOTAL':12}: {total:>6}")
+    for s in STATUSES:
+        out.append(f"  {s:12}: {counts[s]:>6}")
+
+    out.append(f"  {'TOTAL':12}: {total:>6}")
 
     # =========================================================================
     # 2. WORKER PROCESSES
     # =========================================================================
-    print("\n[2] WORKER PROCESSES")
-    print("-" * 50)
+    out.append("\n[2] WORKER PROCESSES")
+    out.append("-" * 50)
 
-    try:
-        result = subprocess.run(
-            ["pgrep", "-afc", "python3.*workers/factory/worker.py"],
-            capture_output=True, text=True
-        )
-        factory_count = int(result.stdout.strip()) if result.returncode == 0 else 0
-    except:
-        factory_count = 0
+    worker_counts = futures["workers"].result()
+    factory_count = worker_counts["factory"]
 
-    print(f"  Factory Workers: {factory_count}/4 {'✅' if factory_count == 4 else '🔴'}")
+    out.append(f"  Factory Workers: {factory_count}/4 {'✅' if factory_count == 4 else '🔴'}")
 
     # Check for vault/judge workers (may not exist yet)
-    for name, pattern in [("Vault", "vault/worker.py"), ("Judge", "judge/worker.py")]:
-        try:
-            result = subprocess.run(
-                ["pgrep", "-fc", f"python3.*{pattern}"],
-                capture_output=True, text=True
-            )
-            count = int(result.stdout.strip()) if result.returncode == 0 else 0
-        except:
-            count = 0
+    for name, key in [("Vault", "vault"), ("Judge", "judge")]:
+        count = worker_counts[key]
         status = "✅" if count > 0 else "⚪ (not deployed)"
-        print(f"  {name} Workers:   {count}/1 {status}")
+        out.append(f"  {name} Workers:   {count}/1 {status}")
 
     # =========================================================================
     # 3. PENDING CALLS ANALYSIS (Vault Lane Input)
     # =========================================================================
-    print("\n[3] VAULT LANE INPUT (Pending Calls)")
-    print("-" * 50)
+    out.append("\n[3] VAULT LANE INPUT (Pending Calls)")
+    out.append("-" * 50)
 
     if counts["pending"] > 0:
-        pending = schema.from_("calls").select(
-            "id, audio_url, start_time_utc"
-        ).eq("status", "pending").order("start_time_utc", desc=False).limit(10).execute()
+        pending = futures["pending"].result()
 
-        if pending.data:
-            with_url = sum(1 for c in pending.data if c.get("audio_url"))
-            oldest = pending.data[0].get("start_time_utc", "N/A")[:19] if pending.data else "N/A"
+        if pending:
+            with_url = sum(1 for c in pending if c.get("audio_url"))
+            oldest = pending[0].get("start_time_utc", "N/A")[:19]
 
-            print(f"  Total pending: {counts['pending']}")
-            print(f"  With audio_url: {with_url}/{len(pending.data)} (sample)")
-            print(f"  Oldest pending: {oldest}")
+            out.append(f"  Total pending: {counts['pending']}")
+            out.append(f"  With audio_url: {with_url}/{len(pending)} (sample)")
+            out.append(f"  Oldest pending: {oldest}")
 
             if with_url > 0:
-                print(f"  Status: 🔴 VAULT LANE NEEDED - {counts['pending']} calls waiting for audio download")
+                out.append(f"  Status: 🔴 VAULT LANE NEEDED - {counts['pending']} calls waiting for audio download")
             else:
-                print(f"  Status: ⚠️ Pending calls have no audio_url (Ingest issue?)")
+                out.append(f"  Status: ⚠️ Pending calls have no audio_url (Ingest issue?)")
     else:
-        print("  No pending calls - Vault lane has no work ✅")
+        out.append("  No pending calls - Vault lane has no work ✅")
 
     # =========================================================================
     # 4. DOWNLOADED CALLS ANALYSIS (Factory Lane Input)
     # =========================================================================
-    print("\n[4] FACTORY LANE INPUT (Downloaded Calls)")
-    print("-" * 50)
+    out.append("\n[4] FACTORY LANE INPUT (Downloaded Calls)")
+    out.append("-" * 50)
 
     if counts["downloaded"] > 0:
-        downloaded = schema.from_("calls").select(
-            "id, storage_path, retry_count, start_time_utc"
-        ).eq("status", "downloaded").lt("retry_count", 3).order("start_time_utc", desc=True).limit(10).execute()
-
-        processable = len(downloaded.data) if downloaded.data else 0
-        print(f"  Total downloaded: {counts['downloaded']}")
-        print(f"  Processable (retry<3): {processable} (sample)")
+        processable = len(futures["downloaded"].result())
+        out.append(f"  Total downloaded: {counts['downloaded']}")
+        out.append(f"  Processable (retry<3): {processable} (sample)")
 
         if processable > 0 and factory_count > 0:
-            print(f"  Status: ✅ Factory workers processing")
+            out.append(f"  Status: ✅ Factory workers processing")
         elif processable > 0 and factory_count == 0:
-            print(f"  Status: 🔴 Work available but no workers!")
+            out.append(f"  Status: 🔴 Work available but no workers!")
         else:
-            print(f"  Status: ⚠️ All downloaded calls have retry_count >= 3")
+            out.append(f"  Status: ⚠️ All downloaded calls have retry_count >= 3")
     else:
-        print("  No downloaded calls - Factory lane has no work")
+        out.append("  No downloaded calls - Factory lane has no work")
         if counts["pending"] > 0:
-            print("  Status: 🔴 Blocked - need Vault to download audio first")
+            out.append("  Status: 🔴 Blocked - need Vault to download audio first")
         else:
-            print("  Status: ✅ Queue empty")
+            out.append("  Status: ✅ Queue empty")
 
     # =========================================================================
     # 5. PROCESSING CALLS (Active Work)
     # =========================================================================
-    print("\n[5] ACTIVE PROCESSING")
-    print("-" * 50)
+    out.append("\n[5] ACTIVE PROCESSING")
+    out.append("-" * 50)
 
     if counts["processing"] > 0:
-        processing = schema.from_("calls").select(
-            "id, updated_at"
-        ).eq("status", "processing").execute()
-
-        print(f"  Currently processing: {counts['processing']}")
-
-        # Check for stuck jobs
-        now = datetime.now(timezone.utc)
-        stuck = 0
-        for c in processing.data:
-            updated = c.get("updated_at")
-            if updated:
-                try:
-                    updated_dt = datetime.fromisoformat(updated.replace("Z", "+00:00"))
-                    age_minutes = (now - updated_dt).total_seconds() / 60
-                    if age_minutes > 30:
-                        stuck += 1
-                except:
-                    pass
+        out.append(f"  Currently processing: {counts['processing']}")
+
+        # Check for stuck jobs (counted server-side by get_status_counts)
+        stuck = status_counts.get("stuck", 0)
 
         if stuck > 0:
-            print(f"  Stuck (>30 min): {stuck} 🔴 ZOMBIE KILLER NEEDED")
+            out.append(f"  Stuck (>30 min): {stuck} 🔴 ZOMBIE KILLER NEEDED")
         else:
-            print(f"  All jobs healthy ✅")
+            out.append(f"  All jobs healthy ✅")
     else:
-        print("  No jobs currently processing")
+        out.append("  No jobs currently processing")
 
     # =========================================================================
     # 6. TRANSCRIBED CALLS (Judge Lane Input)
     # =========================================================================
-    print("\n[6] JUDGE LANE INPUT (Transcribed Calls)")
-    print("-" * 50)
+    out.append("\n[6] JUDGE LANE INPUT (Transcribed Calls)")
+    out.append("-" * 50)
 
     if counts["transcribed"] > 0:
-        transcribed = schema.from_("calls").select(
-            "id, transcript_text"
-        ).eq("status", "transcribed").is_("qa_flags", "null").limit(5).execute()
-
-        awaiting_qa = len(transcribed.data) if transcribed.data else 0
-        print(f"  Total transcribed: {counts['transcribed']}")
-        print(f"  Awaiting QA: {awaiting_qa}+ (sample)")
-        print(f"  Status: 🔴 JUDGE LANE NEEDED - calls waiting for QA analysis")
+        awaiting_qa = len(futures["transcribed"].result())
+        out.append(f"  Total transcribed: {counts['transcribed']}")
+        out.append(f"  Awaiting QA: {awaiting_qa}+ (sample)")
+        out.append(f"  Status: 🔴 JUDGE LANE NEEDED - calls waiting for QA analysis")
     else:
-        print("  No transcribed calls awaiting QA ✅")
+        out.append("  No transcribed calls awaiting QA ✅")
 
     # =========================================================================
     # 7. SUCCESS METRICS
     # =========================================================================
-    print("\n[7] SUCCESS METRICS")
-    print("-" * 50)
+    out.append("\n[7] SUCCESS METRICS")
+    out.append("-" * 50)
 
     success_count = counts["flagged"] + counts["safe"]
-    print(f"  Fully processed: {success_count}")
-    print(f"    - Flagged: {counts['flagged']}")
-    print(f"    - Safe: {counts['safe']}")
-    print(f"  Failed: {counts['failed']}")
+    out.append(f"  Fully processed: {success_count}")
+    out.append(f"    - Flagged: {counts['flagged']}")
+    out.append(f"    - Safe: {counts['safe']}")
+    out.append(f"  Failed: {counts['failed']}")
 
     if total > 0:
         success_rate = (success_count / total) * 100
-        print(f"  Success rate: {success_rate:.1f}%")
+        out.append(f"  Success rate: {success_rate:.1f}%")
 
     # =========================================================================
     # 8. FAILED CALLS ANALYSIS
     # =========================================================================
-    print("\n[8] FAILED CALLS ANALYSIS")
-    print("-" * 50)
+    out.append("\n[8] FAILED CALLS ANALYSIS")
+    out.append("-" * 50)
 
     if counts["failed"] > 0:
-        failed = schema.from_("calls").select(
-            "processing_error"
-        ).eq("status", "failed").limit(200).execute()
-
-        errors = Counter()
-        for c in failed.data:
-            err = str(c.get("processing_error") or "No error")[:60]
-            errors[err] += 1
-
-        print(f"  Total failed: {counts['failed']}")
-        print(f"  Top error patterns:")
-        for err, count in errors.most_common(5):
-            print(f"    [{count:>4}x] {err}...")
+        out.append(f"  Total failed: {counts['failed']}")
+        out.append(f"  Top error patterns:")
+        for row in futures["errors"].result():
+            out.append(f"    [{row['n']:>4}x] {row['error']}...")
     else:
-        print("  No failed calls ✅")
+        out.append("  No failed calls ✅")
 
     # =========================================================================
     # 9. RECENT ACTIVITY
     # =========================================================================
-    print("\n[9] RECENT ACTIVITY (Last Hour)")
-    print("-" * 50)
+    out.append("\n[9] RECENT ACTIVITY (Last Hour)")
+    out.append("-" * 50)
 
-    one_hour_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    recent = futures["recent"].result()
 
     for status in ["transcribed", "flagged", "safe"]:
-        result = schema.from_("calls").select(
-            "id", count="exact"
-        ).eq("status", status).gte("updated_at", one_hour_ago).execute()
-        count = result.count or 0
-        print(f"  New {status}: {count}")
+        out.append(f"  New {status}: {recent.get(status, 0)}")
 
     # =========================================================================
     # 10. ZOMBIE KILLER STATUS
     # =========================================================================
-    print("\n[10] ZOMBIE KILLER STATUS")
-    print("-" * 50)
+    out.append("\n[10] ZOMBIE KILLER STATUS")
+    out.append("-" * 50)
 
     # Can't directly query cron.job from Supabase client, so check for stuck jobs
-    stuck_check = schema.from_("calls").select(
-        "id", count="exact"
-    ).eq("status", "processing").lt(
-        "updated_at",
-        (datetime.now(timezone.utc) - timedelta(minutes=30)).isoformat()
-    ).execute()
-
-    stuck_count = stuck_check.count or 0
+    # (counted by get_status_counts in [1])
+    stuck_count = status_counts.get("stuck", 0)
     if stuck_count > 0:
-        print(f"  Stuck jobs (>30 min): {stuck_count} 🔴")
-        print(f"  Status: ZOMBIE KILLER NOT WORKING or NOT INSTALLED")
+        out.append(f"  Stuck jobs (>30 min): {stuck_count} 🔴")
+        out.append(f"  Status: ZOMBIE KILLER NOT WORKING or NOT INSTALLED")
     else:
-        print(f"  No stuck jobs detected ✅")
-        print(f"  Note: Verify pg_cron job exists in Supabase Dashboard")
+        out.append(f"  No stuck jobs detected ✅")
+        out.append(f"  Note: Verify pg_cron job exists in Supabase Dashboard")
 
     # =========================================================================
     # SUMMARY
     # =========================================================================
-    print("\n" + "=" * 65)
-    print("  SUMMARY")
-    print("=" * 65)
+    out.append("\n" + "=" * 65)
+    out.append("  SUMMARY")
+    out.append("=" * 65)
 
     issues = []
 
@@ -282,13 +347,15 @@ def main():
         issues.append(f"Zombie Killer needed: {stuck_count} stuck jobs")
 
     if issues:
-        print("\n  🔴 ISSUES TO FIX:")
+        out.append("\n  🔴 ISSUES TO FIX:")
         for issue in issues:
-            print(f"    - {issue}")
+            out.append(f"    - {issue}")
     else:
-        print("\n  ✅ ALL SYSTEMS OPERATIONAL")
+        out.append("\n  ✅ ALL SYSTEMS OPERATIONAL")
+
+    out.append("\n" + "=" * 65)
 
-    print("\n" + "=" * 65)
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 if __name__ == "__main__":
@@ -124,7 +124,7 @@ restart_workers() {
     cd /workspace
 
     export PYTHONPATH=/workspace
-    export PYTORCH_CUDA_ALLOC_CONF="expandable_segments:True"
+    export PYTORCH_CUDA_ALLOC_CONF="expandable_segments:True,garbage_collection_threshold:0.8"
 
     bash "$FLEET_MANAGER" restart >> "$LOG_FILE" 2>&1
 }
@@ -0,0 +1,36 @@
+-- =============================================================================
+-- Migration 63: Health Snapshot RPC
+-- =============================================================================
+-- Purpose: Give the watchdog (scripts/health_check.py) a single round-trip
+-- that both proves database connectivity and returns queue counts.
+--
+-- Previously the watchdog issued a `SELECT id LIMIT 1` connectivity probe plus
+-- a separate queue-stats fetch. One RPC replaces both: a successful call is
+-- the connectivity proof, and all status counts come from one scan.
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION core.health_snapshot()
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+  SELECT json_build_object(
+    'pending',     COUNT(*) FILTER (WHERE status = 'pending'),
+    'downloaded',  COUNT(*) FILTER (WHERE status = 'downloaded'),
+    'processing',  COUNT(*) FILTER (WHERE status = 'processing'),
+    'transcribed', COUNT(*) FILTER (WHERE status = 'transcribed'),
+    'flagged',     COUNT(*) FILTER (WHERE status = 'flagged'),
+    'safe',        COUNT(*) FILTER (WHERE status = 'safe'),
+    'failed',      COUNT(*) FILTER (WHERE status = 'failed')
+  )
+  FROM core.calls;
+$$;
+
+COMMENT ON FUNCTION core.health_snapshot() IS
+'Watchdog: queue counts by status in one scan. A successful call doubles as the DB connectivity check.';
+
+-- Cross-org counts: workers only (service_role)
+REVOKE EXECUTE ON FUNCTION core.health_snapshot() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.health_snapshot() TO service_role;
@@ -0,0 +1,29 @@
+-- =============================================================================
+-- Migration 64: Queue Status Counts RPC
+-- =============================================================================
+-- Purpose: Replace the per-status `count=exact` loop used by the workers'
+-- get_queue_stats() (7 sequential PostgREST round-trips) with one grouped
+-- aggregate.
+--
+-- Statuses with no rows are simply absent from the result; callers default
+-- them to 0.
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION core.queue_status_counts()
+RETURNS TABLE(status TEXT, n BIGINT)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+  SELECT c.status, COUNT(*)::BIGINT AS n
+  FROM core.calls c
+  GROUP BY c.status;
+$$;
+
+COMMENT ON FUNCTION core.queue_status_counts() IS
+'Workers: call counts grouped by status in a single scan (replaces one count query per status).';
+
+-- Cross-org counts: workers only (service_role)
+REVOKE EXECUTE ON FUNCTION core.queue_status_counts() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.queue_status_counts() TO service_role;
@@ -0,0 +1,52 @@
+-- =============================================================================
+-- Migration 65: Bulk Recovery RPC
+-- =============================================================================
+-- Purpose: Let scripts/recover_failed.py reset a batch of failed calls with
+-- one UPDATE instead of one PostgREST request per call.
+--
+-- Target status:
+--   - 'downloaded' → audio already in storage, re-run Factory
+--   - 'pending'    → audio_url only, re-run Vault first
+--
+-- Only rows still in status='failed' are touched, so re-running a batch
+-- (or racing another recovery run) is harmless.
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION core.bulk_recover(
+  p_ids UUID[],
+  p_target TEXT
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+DECLARE
+  v_count INTEGER;
+BEGIN
+  IF p_target NOT IN ('downloaded', 'pending') THEN
+    RAISE EXCEPTION 'Invalid recovery target: % (expected downloaded or pending)', p_target;
+  END IF;
+
+  UPDATE core.calls
+  SET
+    status = p_target,
+    retry_count = 0,
+    processing_error = '[Recovered ' || to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI') || '] '
+      || LEFT(COALESCE(processing_error, ''), 200),
+    updated_at = now()
+  WHERE
+    id = ANY(p_ids)
+    AND status = 'failed';
+
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$;
+
+COMMENT ON FUNCTION core.bulk_recover(UUID[], TEXT) IS
+'Dead letter recovery: resets a batch of failed calls to downloaded/pending with retry_count=0. Used by scripts/recover_failed.py.';
+
+-- Cross-org write: workers/scripts only (service_role)
+REVOKE EXECUTE ON FUNCTION core.bulk_recover(UUID[], TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.bulk_recover(UUID[], TEXT) TO service_role;
@@ -0,0 +1,46 @@
+-- =============================================================================
+-- Migration 66: Health Snapshot Stall Watermark
+-- =============================================================================
+-- Purpose: Let the watchdog detect queue stalls from a time watermark instead
+-- of the instantaneous `processing = 0 AND downloaded > 0` snapshot, which
+-- fires on every healthy drain where a worker is between claims.
+--
+-- Adds `downloaded_age_seconds` to core.health_snapshot(): seconds since the
+-- oldest 'downloaded' row was last touched (0 when none are waiting).
+-- The partial index turns that MIN() into a single index probe.
+-- =============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_calls_downloaded_updated
+ON core.calls (updated_at)
+WHERE status = 'downloaded';
+
+CREATE OR REPLACE FUNCTION core.health_snapshot()
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+  SELECT json_build_object(
+    'pending',     COUNT(*) FILTER (WHERE status = 'pending'),
+    'downloaded',  COUNT(*) FILTER (WHERE status = 'downloaded'),
+    'processing',  COUNT(*) FILTER (WHERE status = 'processing'),
+    'transcribed', COUNT(*) FILTER (WHERE status = 'transcribed'),
+    'flagged',     COUNT(*) FILTER (WHERE status = 'flagged'),
+    'safe',        COUNT(*) FILTER (WHERE status = 'safe'),
+    'failed',      COUNT(*) FILTER (WHERE status = 'failed'),
+    'downloaded_age_seconds', COALESCE((
+      SELECT EXTRACT(EPOCH FROM now() - MIN(d.updated_at))::INTEGER
+      FROM core.calls d
+      WHERE d.status = 'downloaded'
+    ), 0)
+  )
+  FROM core.calls;
+$$;
+
+COMMENT ON FUNCTION core.health_snapshot() IS
+'Watchdog: queue counts by status in one scan plus the age of the oldest downloaded row. A successful call doubles as the DB connectivity check.';
+
+-- Cross-org counts: workers only (service_role)
+REVOKE EXECUTE ON FUNCTION core.health_snapshot() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.health_snapshot() TO service_role;
@@ -0,0 +1,40 @@
+-- =============================================================================
+-- Migration 67: Status Counts RPC (with stuck-job count)
+-- =============================================================================
+-- Purpose: Give scripts/verify_system.py all queue counts in one round-trip.
+--
+-- Previously the script issued one `count=exact` request per status (7) plus
+-- a separate stuck-job count for the Zombie Killer section. This returns all
+-- of them from a single scan of core.calls.
+--
+-- `stuck` counts 'processing' rows not updated since p_stuck_cutoff.
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION core.get_status_counts(
+  p_stuck_cutoff TIMESTAMPTZ
+)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+  SELECT json_build_object(
+    'pending',     COUNT(*) FILTER (WHERE status = 'pending'),
+    'downloaded',  COUNT(*) FILTER (WHERE status = 'downloaded'),
+    'processing',  COUNT(*) FILTER (WHERE status = 'processing'),
+    'transcribed', COUNT(*) FILTER (WHERE status = 'transcribed'),
+    'flagged',     COUNT(*) FILTER (WHERE status = 'flagged'),
+    'safe',        COUNT(*) FILTER (WHERE status = 'safe'),
+    'failed',      COUNT(*) FILTER (WHERE status = 'failed'),
+    'stuck',       COUNT(*) FILTER (WHERE status = 'processing' AND updated_at < p_stuck_cutoff)
+  )
+  FROM core.calls;
+$$;
+
+COMMENT ON FUNCTION core.get_status_counts(TIMESTAMPTZ) IS
+'System verification: call counts by status plus processing rows stuck since the cutoff, in one scan.';
+
+-- Cross-org counts: workers/scripts only (service_role)
+REVOKE EXECUTE ON FUNCTION core.get_status_counts(TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.get_status_counts(TIMESTAMPTZ) TO service_role;
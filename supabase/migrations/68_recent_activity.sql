@@ -0,0 +1,39 @@
+-- =============================================================================
+-- Migration 68: Recent Activity RPC
+-- =============================================================================
+-- Purpose: Give scripts/verify_system.py the "last hour" completion counts
+-- (transcribed / flagged / safe) in one round-trip instead of one count
+-- request per status.
+--
+-- The composite (status, updated_at) index lets each filtered count be a
+-- range scan within its status.
+-- =============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_calls_status_updated
+ON core.calls (status, updated_at);
+
+CREATE OR REPLACE FUNCTION core.recent_activity(
+  p_since TIMESTAMPTZ
+)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+  SELECT json_build_object(
+    'transcribed', COUNT(*) FILTER (WHERE status = 'transcribed'),
+    'flagged',     COUNT(*) FILTER (WHERE status = 'flagged'),
+    'safe',        COUNT(*) FILTER (WHERE status = 'safe')
+  )
+  FROM core.calls
+  WHERE status IN ('transcribed', 'flagged', 'safe')
+    AND updated_at >= p_since;
+$$;
+
+COMMENT ON FUNCTION core.recent_activity(TIMESTAMPTZ) IS
+'System verification: transcribed/flagged/safe calls updated since p_since, in one query.';
+
+-- Cross-org counts: workers/scripts only (service_role)
+REVOKE EXECUTE ON FUNCTION core.recent_activity(TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.recent_activity(TIMESTAMPTZ) TO service_role;
@@ -0,0 +1,35 @@
+-- =============================================================================
+-- Migration 69: Top Failed Errors RPC
+-- =============================================================================
+-- Purpose: Let scripts/verify_system.py show the most common failure reasons
+-- without shipping failed rows to the client and counting them in Python.
+--
+-- Errors are grouped by their first 60 characters (missing/empty errors are
+-- reported as 'No error'), most frequent first.
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION core.top_failed_errors(
+  p_limit INTEGER DEFAULT 5
+)
+RETURNS TABLE(error TEXT, n BIGINT)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+  SELECT
+    COALESCE(NULLIF(LEFT(c.processing_error, 60), ''), 'No error') AS error,
+    COUNT(*)::BIGINT AS n
+  FROM core.calls c
+  WHERE c.status = 'failed'
+  GROUP BY 1
+  ORDER BY 2 DESC
+  LIMIT p_limit;
+$$;
+
+COMMENT ON FUNCTION core.top_failed_errors(INTEGER) IS
+'System verification: most common failed-call error prefixes (60 chars) with counts.';
+
+-- Cross-org data: workers/scripts only (service_role)
+REVOKE EXECUTE ON FUNCTION core.top_failed_errors(INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.top_failed_errors(INTEGER) TO service_role;
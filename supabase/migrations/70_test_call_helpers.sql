@@ -0,0 +1,71 @@
+-- =============================================================================
+-- Migration 70: Test Call Helpers
+-- =============================================================================
+-- Purpose: Let scripts/test_vault_locking.py create and remove its fixture
+-- calls in one round-trip each, instead of one insert/delete per test.
+--
+-- Fixture calls are 'pending' with a dummy audio_url and a TEST- prefixed
+-- ringba_call_id. Cleanup only deletes rows carrying that prefix, so it can
+-- never remove real calls even if handed the wrong ids.
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION core.bulk_create_test_calls(
+  p_count INTEGER,
+  p_org_id UUID
+)
+RETURNS UUID[]
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+  WITH inserted AS (
+    INSERT INTO core.calls (id, ringba_call_id, org_id, status, audio_url, storage_path, start_time_utc)
+    SELECT
+      g.id,
+      'TEST-' || left(g.id::text, 8),
+      p_org_id,
+      'pending',
+      'https://example.com/test.mp3',
+      NULL,
+      now()
+    FROM (
+      SELECT gen_random_uuid() AS id
+      FROM generate_series(1, p_count)
+    ) g
+    RETURNING id
+  )
+  SELECT array_agg(id) FROM inserted;
+$$;
+
+COMMENT ON FUNCTION core.bulk_create_test_calls(INTEGER, UUID) IS
+'Tests: insert p_count pending fixture calls (TEST- ringba ids) in one statement and return their ids.';
+
+CREATE OR REPLACE FUNCTION core.bulk_cleanup_test_calls(
+  p_ids UUID[]
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+DECLARE
+  v_count INTEGER;
+BEGIN
+  DELETE FROM core.calls
+  WHERE
+    id = ANY(p_ids)
+    AND ringba_call_id LIKE 'TEST-%';
+
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$;
+
+COMMENT ON FUNCTION core.bulk_cleanup_test_calls(UUID[]) IS
+'Tests: delete fixture calls created by bulk_create_test_calls (TEST- ringba ids only).';
+
+-- Test fixtures: service_role only
+REVOKE EXECUTE ON FUNCTION core.bulk_create_test_calls(INTEGER, UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.bulk_create_test_calls(INTEGER, UUID) TO service_role;
+REVOKE EXECUTE ON FUNCTION core.bulk_cleanup_test_calls(UUID[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.bulk_cleanup_test_calls(UUID[]) TO service_role;
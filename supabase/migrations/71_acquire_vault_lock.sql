@@ -0,0 +1,52 @@
+-- =============================================================================
+-- Migration 71: Acquire Vault Lock RPC
+-- =============================================================================
+-- Purpose: Claim a pending call for download with SELECT ... FOR UPDATE
+-- SKIP LOCKED instead of a contended conditional UPDATE.
+--
+-- With the plain UPDATE, every competing Vault worker queues on the same row
+-- lock and re-evaluates the predicate. Here losers skip the locked row and
+-- return false immediately; only the winner writes the lock sentinel.
+--
+-- The sentinel ('vault_lock:{first 8 chars of id}') still outlives this
+-- transaction because the download happens afterwards, so a crashed worker
+-- is still recovered by core.release_stale_vault_locks (migration 43).
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION core.acquire_vault_lock(
+  p_call_id UUID
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+BEGIN
+  PERFORM 1
+  FROM core.calls
+  WHERE
+    id = p_call_id
+    AND status = 'pending'
+    AND storage_path IS NULL
+  FOR UPDATE SKIP LOCKED;
+
+  IF NOT FOUND THEN
+    RETURN FALSE;
+  END IF;
+
+  UPDATE core.calls
+  SET
+    storage_path = 'vault_lock:' || left(p_call_id::text, 8),
+    updated_at = now()
+  WHERE id = p_call_id;
+
+  RETURN TRUE;
+END;
+$$;
+
+COMMENT ON FUNCTION core.acquire_vault_lock(UUID) IS
+'Vault lane: claim a pending call for download (FOR UPDATE SKIP LOCKED). Returns false if already claimed or locked by another worker.';
+
+-- Cross-org write: workers only (service_role)
+REVOKE EXECUTE ON FUNCTION core.acquire_vault_lock(UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.acquire_vault_lock(UUID) TO service_role;
@@ -0,0 +1,86 @@
+-- =============================================================================
+-- Migration 72: Factory Batch RPCs
+-- =============================================================================
+-- Purpose: Cut the Factory lane's PostgREST round trips per batch.
+--
+-- core.claim_factory_calls
+--   Replaces fetch (SELECT ... LIMIT n) + one conditional UPDATE per call.
+--   Picks the newest 'downloaded' calls (LIFO) with FOR UPDATE SKIP LOCKED,
+--   so concurrent workers never block on or double-claim the same rows, and
+--   marks them 'processing' with retry_count incremented in the same
+--   statement. Returns the claimed rows with the NEW retry_count (the
+--   attempt number).
+--
+-- core.save_transcriptions
+--   Writes a batch of transcription results in one UPDATE.
+--   p_results: [{"id": uuid, "text": text, "segments": jsonb}, ...]
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION core.claim_factory_calls(
+  p_limit INTEGER
+)
+RETURNS TABLE(id UUID, storage_path TEXT, retry_count INTEGER)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE core.calls c
+  SET
+    status = 'processing',
+    retry_count = c.retry_count + 1,
+    updated_at = now()
+  FROM (
+    SELECT calls.id
+    FROM core.calls
+    WHERE
+      calls.status = 'downloaded'
+      AND calls.retry_count < 3
+    ORDER BY calls.start_time_utc DESC
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  ) picked
+  WHERE c.id = picked.id
+  RETURNING c.id, c.storage_path, c.retry_count;
+END;
+$$;
+
+COMMENT ON FUNCTION core.claim_factory_calls(INTEGER) IS
+'Factory lane: claim up to p_limit downloaded calls (LIFO, FOR UPDATE SKIP LOCKED), marking them processing. Returns id, storage_path and the incremented retry_count.';
+
+CREATE OR REPLACE FUNCTION core.save_transcriptions(
+  p_results JSONB
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+DECLARE
+  v_count INTEGER;
+BEGIN
+  UPDATE core.calls c
+  SET
+    status = 'transcribed',
+    transcript_text = r.text,
+    transcript_segments = r.segments,
+    processing_error = NULL,
+    updated_at = now()
+  FROM jsonb_to_recordset(p_results) AS r(id UUID, text TEXT, segments JSONB)
+  WHERE c.id = r.id;
+
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$;
+
+COMMENT ON FUNCTION core.save_transcriptions(JSONB) IS
+'Factory lane: save a batch of transcription results ([{id, text, segments}]) in one UPDATE. Returns rows updated.';
+
+-- Cross-org writes: workers only (service_role)
+REVOKE EXECUTE ON FUNCTION core.claim_factory_calls(INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.claim_factory_calls(INTEGER) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION core.save_transcriptions(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.save_transcriptions(JSONB) TO service_role;
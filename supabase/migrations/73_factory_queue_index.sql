@@ -0,0 +1,26 @@
+-- =============================================================================
+-- Migration 73: Factory Queue Partial Index
+-- =============================================================================
+-- Purpose: Serve core.claim_factory_calls' LIFO scan from an index that only
+-- holds the claimable rows.
+--
+-- The only status index, idx_calls_org_queue (org_id, status,
+-- start_time_utc DESC) from migration 15, leads with org_id. The claim is
+-- cross-org, so it cannot range-scan 'downloaded' rows in start_time order
+-- from it and falls back to scanning and sorting every downloaded call.
+-- This partial index holds only 'downloaded' rows in claim order, and
+-- INCLUDE (retry_count) lets the `retry_count < p_max_retries` filter skip
+-- poison pills from the index alone; the heap is only visited for rows
+-- actually locked.
+--
+-- storage_path is not fetched separately: claim_factory_calls already
+-- returns it from the same UPDATE ... RETURNING.
+-- =============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_calls_factory_queue
+ON core.calls (start_time_utc DESC)
+INCLUDE (retry_count)
+WHERE status = 'downloaded';
+
+COMMENT ON INDEX core.idx_calls_factory_queue IS
+'Factory lane: claimable (downloaded) calls in LIFO order for core.claim_factory_calls.';
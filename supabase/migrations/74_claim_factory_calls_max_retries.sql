@@ -0,0 +1,50 @@
+-- =============================================================================
+-- Migration 74: claim_factory_calls Retry Limit Parameter
+-- =============================================================================
+-- Purpose: Make the Factory claim honour the worker's MAX_RETRIES setting
+-- instead of a hardcoded 3, so the claim filter and mark_failed's dead-letter
+-- check read the same limit.
+--
+-- p_max_retries defaults to 3 (the previous behaviour). The old one-argument
+-- signature is dropped first so PostgREST never sees two overloads.
+-- =============================================================================
+
+DROP FUNCTION IF EXISTS core.claim_factory_calls(INTEGER);
+
+CREATE OR REPLACE FUNCTION core.claim_factory_calls(
+  p_limit INTEGER,
+  p_max_retries INTEGER DEFAULT 3
+)
+RETURNS TABLE(id UUID, storage_path TEXT, retry_count INTEGER)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = core, public
+AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE core.calls c
+  SET
+    status = 'processing',
+    retry_count = c.retry_count + 1,
+    updated_at = now()
+  FROM (
+    SELECT calls.id
+    FROM core.calls
+    WHERE
+      calls.status = 'downloaded'
+      AND calls.retry_count < p_max_retries
+    ORDER BY calls.start_time_utc DESC
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  ) picked
+  WHERE c.id = picked.id
+  RETURNING c.id, c.storage_path, c.retry_count;
+END;
+$$;
+
+COMMENT ON FUNCTION core.claim_factory_calls(INTEGER, INTEGER) IS
+'Factory lane: claim up to p_limit downloaded calls with retry_count < p_max_retries (LIFO, FOR UPDATE SKIP LOCKED), marking them processing. Returns id, storage_path and the incremented retry_count.';
+
+-- Cross-org writes: workers only (service_role)
+REVOKE EXECUTE ON FUNCTION core.claim_factory_calls(INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION core.claim_factory_calls(INTEGER, INTEGER) TO service_role;
@@ -2,16 +2,6 @@
 
 from .config import Settings, get_settings
 from .logger import setup_logging
-from .models import (
-    load_asr_model,
-    load_diarization_pipeline,
-    verify_gpu_available,
-    get_gpu_memory_free,
-    check_memory_for_processing,
-    get_audio_duration,
-    transcribe,
-    diarize,
-)
 from .db import CallsRepository, create_repository
 from .alignment import align_transcript_with_speakers, get_speaker_summary
 from .circuit_breaker import (
@@ -22,6 +12,32 @@ from .circuit_breaker import (
     get_all_circuit_stats,
 )
 
+# Model helpers live in .models, which imports torch at module load.
+# They are resolved on first access (PEP 562) so the CPU lanes, scripts and
+# config validation never pay for the GPU stack.
+_MODEL_EXPORTS = frozenset({
+    "load_asr_model",
+    "load_diarization_pipeline",
+    "load_vad_model",
+    "verify_gpu_available",
+    "get_gpu_memory_free",
+    "check_memory_for_processing",
+    "get_audio_duration",
+    "load_audio",
+    "transcribe",
+    "transcribe_batch",
+    "diarize",
+    "model_streams",
+})
+
+
+def __getattr__(name: str):
+    if name in _MODEL_EXPORTS:
+        from . import models
+        return getattr(models, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     # Config
     "Settings",
@@ -31,12 +47,16 @@ __all__ = [
     # Models
     "load_asr_model",
     "load_diarization_pipeline",
+    "load_vad_model",
     "verify_gpu_available",
     "get_gpu_memory_free",
     "check_memory_for_processing",
     "get_audio_duration",
+    "load_audio",
     "transcribe",
+    "transcribe_batch",
     "diarize",
+    "model_streams",
     # Database
     "CallsRepository",
     "create_repository",
@@ -15,10 +15,25 @@ This is an approximation but provides reasonable results for most calls.
 
 import logging
 import re
+from dataclasses import dataclass
 from typing import Optional
 
+import numpy as np
+
 logger = logging.getLogger("worker")
 
+# Matches tokens made only of punctuation (compiled once; runs per word)
+_PUNCTUATION_ONLY = re.compile(r'[.,!?;:\'"()-]+').fullmatch
+
+
+@dataclass(slots=True)
+class AlignedSegment:
+    """Speaker turn with its share of the transcript (internal to alignment)."""
+    speaker: str
+    start: float
+    end: float
+    text: str
+
 
 def align_transcript_with_speakers(
     transcript_text: str,
@@ -48,11 +63,15 @@ def align_transcript_with_speakers(
         logger.warning("No words extracted from transcript")
         return diarization_segments
 
+    # Segment times as arrays, so the allocation below runs in NumPy
+    # instead of a per-segment Python loop
+    count = len(diarization_segments)
+    starts = np.fromiter((seg.get("start", 0) for seg in diarization_segments), dtype=np.float64, count=count)
+    ends = np.fromiter((seg.get("end", 0) for seg in diarization_segments), dtype=np.float64, count=count)
+    durations = np.maximum(ends - starts, 0)
+
     # Calculate total speaking time
-    total_duration = sum(
-        max(0, seg.get("end", 0) - seg.get("start", 0))
-        for seg in diarization_segments
-    )
+    total_duration = float(durations.sum())
 
     if total_duration <= 0:
         logger.warning("Invalid total duration, returning original segments")
@@ -62,43 +81,32 @@ def align_transcript_with_speakers(
     words_per_second = len(words) / total_duration
     logger.debug(f"Alignment: {len(words)} words / {total_duration:.1f}s = {words_per_second:.2f} wps")
 
-    # Distribute words to segments
-    aligned_segments = []
-    word_index = 0
-
-    for seg in diarization_segments:
-        start = seg.get("start", 0)
-        end = seg.get("end", 0)
-        speaker = seg.get("speaker", "SPEAKER_00")
-        duration = max(0, end - start)
-
-        # Calculate how many words this segment should get
-        word_count = round(duration * words_per_second)
-
-        # Ensure we don't exceed remaining words
-        word_count = min(word_count, len(words) - word_index)
-
-        # Get words for this segment
-        segment_words = words[word_index : word_index + word_count]
-        segment_text = " ".join(segment_words)
-
-        aligned_segments.append({
-            "speaker": speaker,
-            "start": round(start, 3),
-            "end": round(end, 3),
-            "text": segment_text,
-        })
-
-        word_index += word_count
+    # Distribute words to segments: each segment gets a duration-proportional
+    # word count; capping the running total at len(words) ensures we don't
+    # exceed remaining words
+    word_counts = np.round(durations * words_per_second).astype(np.int64)
+    offsets = np.minimum(np.concatenate(([0], np.cumsum(word_counts))), len(words)).tolist()
+
+    aligned_segments = [
+        AlignedSegment(
+            speaker=seg.get("speaker", "SPEAKER_00"),
+            start=start,
+            end=end,
+            text=" ".join(words[offsets[i]:offsets[i + 1]]),
+        )
+        for i, (seg, start, end) in enumerate(zip(
+            diarization_segments,
+            np.round(starts, 3).tolist(),
+            np.round(ends, 3).tolist(),
+        ))
+    ]
+    word_index = offsets[-1]
 
     # Handle remaining words (add to last segment)
     if word_index < len(words) and aligned_segments:
         remaining = " ".join(words[word_index:])
-        last_text = aligned_segments[-1].get("text", "")
-        if last_text:
-            aligned_segments[-1]["text"] = f"{last_text} {remaining}"
-        else:
-            aligned_segments[-1]["text"] = remaining
+        last = aligned_segments[-1]
+        last.text = f"{last.text} {remaining}" if last.text else remaining
         logger.debug(f"Added {len(words) - word_index} remaining words to last segment")
 
     # Merge consecutive segments with same speaker for cleaner output
@@ -109,7 +117,11 @@ def align_transcript_with_speakers(
         f"(from {len(diarization_segments)} raw segments)"
     )
 
-    return merged_segments
+    # Back to plain dicts for storage (same keys/order as before)
+    return [
+        {"speaker": seg.speaker, "start": seg.start, "end": seg.end, "text": seg.text}
+        for seg in merged_segments
+    ]
 
 
 def _split_into_words(text: str) -> list[str]:
@@ -122,21 +134,18 @@ def _split_into_words(text: str) -> list[str]:
     Returns:
         List of words (preserving punctuation attached to words)
     """
-    # Simple split on whitespace, preserving punctuation
-    words = text.split()
-
-    # Filter out empty strings and pure punctuation
-    words = [w for w in words if w and not re.match(r'^[.,!?;:\'"()-]+$', w)]
+    # Split on whitespace (preserving punctuation), dropping pure punctuation
+    return [w for w in text.split() if not _PUNCTUATION_ONLY(w)]
 
-    return words
 
-
-def _merge_same_speaker_segments(segments: list[dict]) -> list[dict]:
+def _merge_same_speaker_segments(segments: list[AlignedSegment]) -> list[AlignedSegment]:
     """
     Merge consecutive segments with the same speaker.
 
     This produces cleaner output by combining adjacent turns
-    from the same speaker.
+    from the same speaker. Segments are extended in place; each turn's
+    text is collected in a list and joined once when the turn closes, so
+    long same-speaker runs don't re-copy the growing string per merge.
 
     Args:
         segments: List of aligned segments
@@ -144,32 +153,25 @@ def _merge_same_speaker_segments(segments: list[dict]) -> list[dict]:
     Returns:
         Merged segments where consecutive same-speaker segments are combined
     """
-    if not segments:
-        return []
-
     merged = []
-    current = None
+    parts = []
 
     for seg in segments:
-        if current is None:
-            current = seg.copy()
-        elif seg.get("speaker") == current.get("speaker"):
+        if merged and seg.speaker == merged[-1].speaker:
             # Same speaker - extend current segment
-            current["end"] = seg.get("end", current.get("end"))
-            current_text = current.get("text", "")
-            seg_text = seg.get("text", "")
-            if current_text and seg_text:
-                current["text"] = f"{current_text} {seg_text}"
-            elif seg_text:
-                current["text"] = seg_text
+            merged[-1].end = seg.end
+            if seg.text:
+                parts.append(seg.text)
         else:
-            # Different speaker - save current and start new
-            merged.append(current)
-            current = seg.copy()
+            # Different speaker - close current and start new
+            if merged:
+                merged[-1].text = " ".join(parts)
+            merged.append(seg)
+            parts = [seg.text] if seg.text else []
 
     # Don't forget the last segment
-    if current is not None:
-        merged.append(current)
+    if merged:
+        merged[-1].text = " ".join(parts)
 
     return merged
 
@@ -193,7 +195,9 @@ def get_speaker_summary(segments: list[dict]) -> dict:
         speaker = seg.get("speaker", "SPEAKER_00")
         duration = max(0, seg.get("end", 0) - seg.get("start", 0))
         text = seg.get("text", "")
-        word_count = len(text.split()) if text else 0
+        # Aligned text is words joined by single spaces, so counting spaces
+        # gives the word count without building a list
+        word_count = text.count(" ") + 1 if text else 0
 
         if speaker not in summary:
             summary[speaker] = {"duration": 0, "word_count": 0}
@@ -5,6 +5,7 @@ Single source of truth for all environment variables and model settings.
 Uses pydantic-settings for validation and type safety.
 """
 
+import re
 from functools import lru_cache
 from typing import Optional
 
@@ -12,6 +13,12 @@ from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+VALID_LOG_LEVELS = frozenset({"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"})
+
+# https://<project-ref>.supabase.co, optionally followed by a path
+_SUPABASE_URL = re.compile(r"https://[a-z0-9-]+\.supabase\.co(?:/|$)")
+
+
 class Settings(BaseSettings):
     """
     Application settings loaded from environment variables.
@@ -94,10 +101,11 @@ class Settings(BaseSettings):
         description="Pyannote diarization pipeline",
     )
 
-    # CRITICAL: Beam decoding fixes CUDA graph failures on RTX 3090
+    # greedy_batch uses CUDA graphs and falls back to beam automatically if
+    # graph capture fails (RTX 3090 "CUDA failure! 35"); "beam" forces beam
     decoding_strategy: str = Field(
-        default="beam",
-        description="TDT decoding strategy (beam fixes CUDA issues)",
+        default="greedy_batch",
+        description="TDT decoding strategy: greedy_batch (CUDA graphs) or beam",
     )
 
     beam_size: int = Field(
@@ -107,6 +115,36 @@ class Settings(BaseSettings):
         description="Beam search width (1 = greedy-equivalent but stable)",
     )
 
+    # Opt-in: torch.compile the Parakeet encoder (mode="reduce-overhead").
+    # The first batch of each new shape pays compilation time.
+    compile_asr_encoder: bool = Field(
+        default=False,
+        description="Wrap the ASR encoder in torch.compile on first load",
+    )
+
+    # Opt-in: cut long calls (>10 min) at pauses found by Silero VAD instead
+    # of fixed 5-minute overlapping chunks; silence is not transcribed
+    vad_chunking: bool = Field(
+        default=False,
+        description="Chunk long calls at silences (Silero VAD, torch.hub)",
+    )
+
+    # Pyannote defaults to 32; with Parakeet resident on the same GPU that
+    # causes allocator pressure and much slower diarization. Tune per GPU.
+    diarization_segmentation_batch_size: int = Field(
+        default=8,
+        ge=1,
+        le=64,
+        description="Pyannote segmentation model batch size",
+    )
+
+    diarization_embedding_batch_size: int = Field(
+        default=8,
+        ge=1,
+        le=64,
+        description="Pyannote speaker embedding model batch size",
+    )
+
     # =========================================================================
     # WORKER SETTINGS
     # =========================================================================
@@ -130,6 +168,13 @@ class Settings(BaseSettings):
         description="Seconds to wait when queue is empty",
     )
 
+    factory_batch_size: int = Field(
+        default=4,
+        ge=1,
+        le=16,
+        description="Calls claimed and transcribed together per Factory batch",
+    )
+
     # =========================================================================
     # JUDGE SETTINGS
     # =========================================================================
@@ -159,20 +204,17 @@ class Settings(BaseSettings):
     @classmethod
     def validate_log_level(cls, v: str) -> str:
         """Ensure log level is valid."""
-        valid_levels = {"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"}
         upper = v.upper()
-        if upper not in valid_levels:
-            raise ValueError(f"log_level must be one of {valid_levels}")
+        if upper not in VALID_LOG_LEVELS:
+            raise ValueError(f"log_level must be one of {set(VALID_LOG_LEVELS)}")
         return upper
 
     @field_validator("supabase_url")
     @classmethod
     def validate_supabase_url(cls, v: str) -> str:
         """Ensure Supabase URL is valid."""
-        if not v.startswith("https://"):
-            raise ValueError("supabase_url must start with https://")
-        if "supabase.co" not in v:
-            raise ValueError("supabase_url must be a Supabase URL")
+        if not _SUPABASE_URL.match(v):
+            raise ValueError("supabase_url must be an https://<project>.supabase.co URL")
         return v
 
     # =========================================================================
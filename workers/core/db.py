@@ -7,114 +7,191 @@ Implements LIFO queue with atomic locking and retry logic.
 
 import logging
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Final
 
+import httpx
+import orjson
 from supabase import Client
 
 logger = logging.getLogger("worker")
 
+# PostgREST connection pool: keep TLS connections alive between queue polls
+# and retry connection setup (never a sent request) on transient failures.
+HTTP_POOL_LIMITS = httpx.Limits(
+    max_keepalive_connections=8,
+    max_connections=16,
+    keepalive_expiry=30.0,
+)
+HTTP_CONNECT_RETRIES = 3
+
+# Default attempts before a call is dead-lettered (Settings.max_retries)
+MAX_RETRIES: Final[int] = 3
+
+# Statuses reported by fetch_queue_stats(), in pipeline order
+QUEUE_STATUSES: Final[tuple[str, ...]] = (
+    "pending", "downloaded", "processing", "transcribed", "flagged", "safe", "failed",
+)
+
+UTC = timezone.utc
+
+
+def _now_iso() -> str:
+    """Current UTC time as an ISO 8601 string (for timestamps inside payloads)."""
+    return datetime.now(UTC).isoformat()
+
+
+def fetch_queue_stats(schema_client) -> dict[str, int]:
+    """
+    Count calls by status with the core.queue_status_counts() RPC.
+
+    All counts come from one grouped query instead of one round-trip per
+    status. Errors are raised; callers decide how to report them.
+
+    Args:
+        schema_client: Result of client.schema("core")
+
+    Returns:
+        Dict of status -> count for every QUEUE_STATUSES entry
+    """
+    response = schema_client.rpc("queue_status_counts").execute()
+    counts = {row["status"]: row["n"] for row in response.data or []}
+    return {status: counts.get(status, 0) for status in QUEUE_STATUSES}
+
+
+def use_pooled_transport(schema_client) -> None:
+    """
+    Swap the PostgREST session transport for a pooled, retrying one.
+
+    supabase-py builds its httpx session with default transport settings;
+    this keeps up to HTTP_POOL_LIMITS keep-alive connections open so
+    consecutive queries reuse the TCP + TLS session, and speaks HTTP/2 so
+    requests from concurrent threads multiplex over one connection.
+
+    Args:
+        schema_client: Result of client.schema(...) (a PostgREST client)
+    """
+    session = getattr(schema_client, "session", None)
+    if not isinstance(session, httpx.Client):
+        logger.debug("PostgREST session is not an httpx.Client - keeping default transport")
+        return
+
+    try:
+        transport = httpx.HTTPTransport(
+            http2=True,
+            limits=HTTP_POOL_LIMITS,
+            retries=HTTP_CONNECT_RETRIES,
+        )
+    except ImportError:
+        # h2 not installed - still pooled, over HTTP/1.1 keep-alive
+        transport = httpx.HTTPTransport(
+            limits=HTTP_POOL_LIMITS,
+            retries=HTTP_CONNECT_RETRIES,
+        )
+
+    session._transport.close()
+    session._transport = transport
+
 
 class CallsRepository:
     """
     Repository for core.calls table operations.
 
+    updated_at is stamped server-side by trg_calls_set_updated_at (migration
+    04_triggers.sql), so update payloads leave it out.
+
     Implements the queue invariants:
     - LIFO ordering (newest first)
     - Atomic locking (prevent duplicate processing)
-    - Retry limit enforcement (max 3 attempts)
+    - Retry limit enforcement (max_retries attempts, 3 by default)
     """
 
-    def __init__(self, client: Client):
+    __slots__ = ("client", "schema", "max_retries")
+
+    def __init__(self, client: Client, max_retries: int = MAX_RETRIES):
         """
         Initialize repository with Supabase client.
 
         Args:
             client: Authenticated Supabase client
+            max_retries: Attempts before a call is dead-lettered; applied to
+                both the queue claim and mark_failed
         """
         self.client = client
+        self.max_retries = max_retries
         self.schema = client.schema("core")
+        use_pooled_transport(self.schema)
 
-    # =========================================================================
-    # QUEUE OPERATIONS
-    # =========================================================================
-
-    def fetch_next_pending_call(self) -> dict[str, Any] | None:
+    def _rpc_orjson(self, fn: str, params: dict[str, Any]) -> Any:
         """
-        Fetch next call from queue (LIFO order) that's ready for processing.
+        Call a core.* RPC with an orjson-encoded request body.
 
-        Query logic:
-        - status = 'downloaded' (audio secured in vault)
-        - retry_count < 3 (skip poison pills)
-        - ORDER BY start_time_utc DESC (LIFO - newest first)
+        postgrest-py encodes params with stdlib json; orjson is several times
+        faster on large payloads such as a batch of transcript segments. The
+        PostgREST session already carries the auth and core-schema headers.
+
+        Args:
+            fn: RPC function name
+            params: RPC arguments
 
         Returns:
-            Call dict with id, storage_path, retry_count or None if queue empty
+            Decoded JSON response
         """
-        try:
-            response = (
-                self.schema
-                .from_("calls")
-                .select("id, storage_path, retry_count")
-                .eq("status", "downloaded")
-                .lt("retry_count", 3)
-                .order("start_time_utc", desc=True)
-                .limit(1)
-                .execute()
-            )
-
-            if not response.data:
-                return None
+        response = self.schema.session.post(
+            f"/rpc/{fn}",
+            content=orjson.dumps(params),
+            headers={"Content-Type": "application/json"},
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)
 
-            call = response.data[0]
-            # Handle NULL retry_count from database
-            if call.get("retry_count") is None:
-                call["retry_count"] = 0
+    # =========================================================================
+    # QUEUE OPERATIONS
+    # =========================================================================
 
-            return call
+    def claim_next_call(self) -> dict[str, Any] | None:
+        """
+        Fetch and lock the next call from queue (LIFO order) in one round trip.
 
-        except Exception as e:
-            logger.error(f"Failed to fetch next pending call: {e}")
-            raise
+        Returns:
+            Claimed call dict with id, storage_path, retry_count (already
+            incremented) or None if queue empty
+        """
+        calls = self.claim_pending_calls(1)
+        return calls[0] if calls else None
 
-    def lock_call(self, call_id: str, current_retry_count: int) -> dict[str, Any] | None:
+    def claim_pending_calls(self, limit: int) -> list[dict[str, Any]]:
         """
-        Atomically lock a call for processing.
+        Fetch and lock up to `limit` calls from queue in one round trip.
 
-        Uses optimistic locking: only succeeds if status is still 'downloaded'.
-        This prevents race conditions when multiple workers poll simultaneously.
+        Runs server-side as a single UPDATE ... RETURNING in
+        core.claim_factory_calls:
+        - status = 'downloaded' (audio secured in vault)
+        - retry_count < max_retries (skip poison pills)
+        - ORDER BY start_time_utc DESC (LIFO - newest first)
+        - FOR UPDATE SKIP LOCKED (concurrent workers skip each other's rows
+          instead of racing for them, so no SELECT work is wasted)
+        - status -> 'processing', retry_count incremented
 
         Args:
-            call_id: UUID of the call to lock
-            current_retry_count: Current retry count (will be incremented)
+            limit: Maximum number of calls to claim
 
         Returns:
-            Updated call record if lock successful, None if lock failed
+            Claimed call dicts with id, storage_path, retry_count; retry_count
+            is already incremented (the current attempt number)
         """
-        new_retry_count = current_retry_count + 1
-
         try:
-            response = (
-                self.schema
-                .from_("calls")
-                .update({
-                    "status": "processing",
-                    "retry_count": new_retry_count,
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                })
-                .eq("id", call_id)
-                .eq("status", "downloaded")  # Optimistic lock condition
-                .execute()
-            )
-
-            if not response.data:
-                logger.warning(f"Lock failed for {call_id} - likely claimed by another worker")
-                return None
+            response = self.schema.rpc(
+                "claim_factory_calls",
+                {"p_limit": limit, "p_max_retries": self.max_retries},
+            ).execute()
+            calls = response.data or []
 
-            logger.debug(f"Locked call {call_id} (attempt {new_retry_count}/3)")
-            return response.data[0]
+            if calls:
+                logger.debug("Claimed %d calls", len(calls))
+            return calls
 
         except Exception as e:
-            logger.error(f"Failed to lock call {call_id}: {e}")
+            logger.error("Failed to claim pending calls: %s", e)
             raise
 
     def release_call(self, call_id: str) -> bool:
@@ -134,24 +211,21 @@ class CallsRepository:
             response = (
                 self.schema
                 .from_("calls")
-                .update({
-                    "status": "downloaded",
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                })
+                .update({"status": "downloaded"})
                 .eq("id", call_id)
                 .eq("status", "processing")  # Only release if we own it
                 .execute()
             )
 
             if response.data:
-                logger.info(f"Released call {call_id} back to queue (resource constraint)")
+                logger.info("Released call %s back to queue (resource constraint)", call_id)
                 return True
             else:
-                logger.warning(f"Could not release call {call_id} - status may have changed")
+                logger.warning("Could not release call %s - status may have changed", call_id)
                 return False
 
         except Exception as e:
-            logger.error(f"Failed to release call {call_id}: {e}")
+            logger.error("Failed to release call %s: %s", call_id, e)
             return False
 
     # =========================================================================
@@ -177,14 +251,34 @@ class CallsRepository:
                 "status": "transcribed",
                 "transcript_text": text,
                 "transcript_segments": segments,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
                 "processing_error": None,  # Clear any previous error
             }).eq("id", call_id).execute()
 
-            logger.info(f"Saved transcription for {call_id} | Len: {len(text)} chars | Segments: {len(segments)}")
+            logger.info("Saved transcription for %s | Len: %d chars | Segments: %d", call_id, len(text), len(segments))
 
         except Exception as e:
-            logger.error(f"Failed to save transcription for {call_id}: {e}")
+            logger.error("Failed to save transcription for %s: %s", call_id, e)
+            raise
+
+    def save_transcriptions(self, results: list[dict[str, Any]]) -> int:
+        """
+        Save a batch of successful transcription results in one RPC.
+
+        Args:
+            results: [{"id": call_id, "text": transcript, "segments": [...]}, ...]
+
+        Returns:
+            Number of calls updated
+        """
+        try:
+            # Segments dominate the payload - encode them with orjson
+            saved = self._rpc_orjson("save_transcriptions", {"p_results": results}) or 0
+
+            logger.info("Saved %d transcriptions in one batch", saved)
+            return saved
+
+        except Exception as e:
+            logger.error("Failed to save %d transcriptions: %s", len(results), e)
             raise
 
     def mark_failed(
@@ -197,16 +291,15 @@ class CallsRepository:
         Mark call as failed or reset for retry.
 
         Logic:
-        - If retry_count < max_retries (3): Reset to 'downloaded' for retry
-        - If retry_count >= max_retries: Mark as 'failed' (dead letter)
+        - If retry_count < self.max_retries: Reset to 'downloaded' for retry
+        - If retry_count >= self.max_retries: Mark as 'failed' (dead letter)
 
         Args:
             call_id: UUID of the call
             error: Error message (truncated to 500 chars)
             current_retry_count: Current retry count
         """
-        max_retries = 3
-        is_dead_letter = current_retry_count >= max_retries
+        is_dead_letter = current_retry_count >= self.max_retries
 
         new_status = "failed" if is_dead_letter else "downloaded"
         error_truncated = error[:500] if error else "Unknown error"
@@ -215,16 +308,15 @@ class CallsRepository:
             self.schema.from_("calls").update({
                 "status": new_status,
                 "processing_error": error_truncated,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
             }).eq("id", call_id).execute()
 
             if is_dead_letter:
-                logger.error(f"Call {call_id} permanently failed after {current_retry_count} attempts: {error_truncated[:100]}")
+                logger.error("Call %s permanently failed after %d attempts: %s", call_id, current_retry_count, error_truncated[:100])
             else:
-                logger.warning(f"Call {call_id} reset to downloaded (attempt {current_retry_count}/{max_retries}): {error_truncated[:100]}")
+                logger.warning("Call %s reset to downloaded (attempt %d/%d): %s", call_id, current_retry_count, self.max_retries, error_truncated[:100])
 
         except Exception as e:
-            logger.error(f"Failed to mark call {call_id} as failed: {e}")
+            logger.error("Failed to mark call %s as failed: %s", call_id, e)
             raise
 
     # =========================================================================
@@ -258,7 +350,7 @@ class CallsRepository:
             return response.data[0] if response.data else None
 
         except Exception as e:
-            logger.error(f"Failed to fetch next transcribed call: {e}")
+            logger.error("Failed to fetch next transcribed call: %s", e)
             raise
 
     def save_qa_results(
@@ -285,14 +377,13 @@ class CallsRepository:
                 "qa_version": qa_version,
                 "judge_model": judge_model,
                 "status": new_status,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
             }).eq("id", call_id).execute()
 
             score = qa_flags.get("score", "?")
-            logger.info(f"Saved QA results for {call_id} | Score: {score} | Status: {new_status}")
+            logger.info("Saved QA results for %s | Score: %s | Status: %s", call_id, score, new_status)
 
         except Exception as e:
-            logger.error(f"Failed to save QA results for {call_id}: {e}")
+            logger.error("Failed to save QA results for %s: %s", call_id, e)
             raise
 
     def mark_qa_skipped(self, call_id: str, reason: str) -> None:
@@ -308,17 +399,16 @@ class CallsRepository:
                 "qa_flags": {
                     "skipped": True,
                     "reason": reason,
-                    "skipped_at": datetime.now(timezone.utc).isoformat(),
+                    "skipped_at": _now_iso(),
                 },
                 "status": "failed",
                 "processing_error": reason,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
             }).eq("id", call_id).execute()
 
-            logger.warning(f"QA skipped for {call_id}: {reason}")
+            logger.warning("QA skipped for %s: %s", call_id, reason)
 
         except Exception as e:
-            logger.error(f"Failed to mark QA skipped for {call_id}: {e}")
+            logger.error("Failed to mark QA skipped for %s: %s", call_id, e)
             raise
 
     # =========================================================================
@@ -329,26 +419,28 @@ class CallsRepository:
         """
         Get current queue statistics by status.
 
+        See fetch_queue_stats().
+
+        Returns:
+            Dict of status -> count (-1 for every status if the query fails)
+        """
+        try:
+            return fetch_queue_stats(self.schema)
+        except Exception:
+            return {status: -1 for status in QUEUE_STATUSES}
+
+    def get_health_snapshot(self) -> dict[str, int]:
+        """
+        Get queue counts via a single core.health_snapshot() RPC.
+
+        Unlike get_queue_stats(), errors are raised rather than masked:
+        a successful call doubles as the database connectivity check.
+
         Returns:
             Dict of status -> count
         """
-        stats = {}
-        statuses = ["pending", "downloaded", "processing", "transcribed", "flagged", "safe", "failed"]
-
-        for status in statuses:
-            try:
-                response = (
-                    self.schema
-                    .from_("calls")
-                    .select("id", count="exact")
-                    .eq("status", status)
-                    .execute()
-                )
-                stats[status] = response.count or 0
-            except Exception:
-                stats[status] = -1
-
-        return stats
+        response = self.schema.rpc("health_snapshot").execute()
+        return response.data or {}
 
     def download_audio(self, storage_path: str) -> bytes:
         """
@@ -362,21 +454,22 @@ class CallsRepository:
         """
         try:
             audio_bytes = self.client.storage.from_("calls_audio").download(storage_path)
-            logger.debug(f"Downloaded {len(audio_bytes)} bytes from {storage_path}")
+            logger.debug("Downloaded %d bytes from %s", len(audio_bytes), storage_path)
             return audio_bytes
         except Exception as e:
-            logger.error(f"Failed to download audio from {storage_path}: {e}")
+            logger.error("Failed to download audio from %s: %s", storage_path, e)
             raise
 
 
-def create_repository(client: Client) -> CallsRepository:
+def create_repository(client: Client, max_retries: int = MAX_RETRIES) -> CallsRepository:
     """
     Factory function to create a CallsRepository.
 
     Args:
         client: Authenticated Supabase client
+        max_retries: Attempts before a call is dead-lettered
 
     Returns:
         Configured CallsRepository instance
     """
-    return CallsRepository(client)
+    return CallsRepository(client, max_retries)
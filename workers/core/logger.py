@@ -4,10 +4,54 @@ CallScript V2 - Logging Configuration
 Configures structured logging to stdout and file.
 """
 
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
+import orjson
+
+# Workers never log thread/process names; skip collecting them per record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line (NDJSON) for the log file.
+
+    Cheaper per record than strftime + %-formatting, and log aggregators
+    ingest it without a parsing rule. `ts` is the Unix epoch in seconds.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode()
+
+
+class _LocalQueueHandler(QueueHandler):
+    """
+    QueueHandler for an in-process queue.
+
+    The stock prepare() formats the message and folds the traceback into
+    it so the record can be pickled. Nothing here is pickled, so the record
+    goes to the listener as-is: formatting happens off the hot path, and
+    JsonFormatter still sees exc_info for its `exc` field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
 
 def setup_logging(
     name: str,
@@ -15,7 +59,11 @@ def setup_logging(
     level: str = "INFO",
 ) -> logging.Logger:
     """
-    Configure logging to stdout and file.
+    Configure logging to stdout (text) and file (NDJSON).
+
+    Log calls only enqueue the record; a background QueueListener thread
+    does the file and stdout writes, so disk I/O stays off the worker's
+    hot path. The listener is flushed and stopped at interpreter exit.
 
     Args:
         name: Logger name (e.g., "worker", "judge")
@@ -37,25 +85,32 @@ def setup_logging(
     if logger.handlers:
         return logger
 
-    # Format: timestamp [LEVEL] message
-    formatter = logging.Formatter(
-        fmt="%(asctime)s [%(levelname)s] %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-
-    # File handler (append mode)
+    # File handler (append mode), NDJSON for log aggregation
     file_handler = logging.FileHandler(log_file, mode="a", encoding="utf-8")
     file_handler.setLevel(logging.DEBUG)  # Capture everything in file
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(JsonFormatter())
 
-    # Stdout handler
+    # Stdout handler, human-readable (supervisord captures it for tailing)
+    # Format: timestamp [LEVEL] message
     stdout_handler = logging.StreamHandler(sys.stdout)
     stdout_handler.setLevel(getattr(logging, level.upper(), logging.INFO))
-    stdout_handler.setFormatter(formatter)
+    stdout_handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+
+    # Route records through a queue to both sinks
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(
+        log_queue,
+        file_handler,
+        stdout_handler,
+        respect_handler_level=True,
+    )
+    listener.start()
+    atexit.register(listener.stop)
 
-    # Add handlers
-    logger.addHandler(file_handler)
-    logger.addHandler(stdout_handler)
+    logger.addHandler(_LocalQueueHandler(log_queue))
 
     return logger
 
@@ -4,19 +4,16 @@ CallScript V2 - Model Loading
 Handles loading of ASR and diarization models with battle-tested configurations.
 
 CRITICAL: The configurations in this file are locked to known working values.
-DO NOT modify the decoding strategy or model parameters without extensive testing.
+DO NOT modify the decoding configs or model parameters without extensive testing.
 """
 
-import gc
 import logging
-import os
 import subprocess
-import tempfile
-from pathlib import Path
-from typing import TYPE_CHECKING
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, BinaryIO, Final
 
 import torch
-from omegaconf import OmegaConf
 
 from .config import Settings
 
@@ -38,14 +35,153 @@ CHUNK_DURATION_SECONDS = 300  # 5 minutes
 # Overlap between chunks to avoid cutting words (seconds)
 CHUNK_OVERLAP_SECONDS = 5
 
+# Rough VRAM one 5-minute chunk takes in a batched ASR forward pass (bf16);
+# scales with input length
+CHUNK_BATCH_GB_PER_CHUNK = 2.0
+
+# VRAM left free when sizing ASR batches (diarization runs alongside)
+CHUNK_BATCH_RESERVE_GB = 2.0
+
+# A batch only takes inputs at least this fraction of its longest input's
+# length; shorter ones start a new batch instead of being padded up to it
+LENGTH_BUCKET_RATIO = 0.5
+
+
+# =============================================================================
+# DECODING CONFIGURATION
+# =============================================================================
+# Sample rate Parakeet expects; used for the decoder warmup input
+ASR_SAMPLE_RATE = 16000
+
+# Warmup transcriptions run before the first real call so cuBLAS/JIT lazy
+# allocations settle before the CUDA graph decoder captures
+DECODER_WARMUP_ITERATIONS = 3
+
+# Eager segmentation passes before its CUDA graph is captured (same reason)
+SEGMENTATION_WARMUP_ITERATIONS = 3
+
+# Mixed precision for ASR and diarization: the RTX 3090 (Ampere) has bf16
+# tensor cores, which FP32 inference leaves idle. Weights stay FP32; autocast
+# picks the precision per op.
+AUTOCAST_DTYPE = torch.bfloat16
+
+
+@contextmanager
+def _gpu_inference():
+    """No autograd bookkeeping + bf16 autocast, for every model forward pass."""
+    with torch.inference_mode(), torch.autocast(device_type="cuda", dtype=AUTOCAST_DTYPE):
+        yield
+
+
+@lru_cache
+def model_streams() -> tuple[torch.cuda.Stream, torch.cuda.Stream]:
+    """
+    (asr, diarization) CUDA streams, created once.
+
+    Neither model runs on the default stream, so their kernels never
+    serialize behind each other or behind default-stream sync points:
+    Parakeet is encoder-heavy and pyannote segmentation-heavy, so they can
+    overlap on the SMs.
+    """
+    return torch.cuda.Stream(), torch.cuda.Stream()
+
+
+# Fixed decoding hyperparameters; only beam_size comes from Settings
+_TDT_BASE: Final[dict] = {
+    "model_type": "tdt",
+    # TDT-specific: duration buckets for Token-and-Duration Transducer
+    "durations": [0, 1, 2, 3, 4],
+}
+
+_GREEDY_DECODING: Final[dict] = {
+    **_TDT_BASE,
+    "strategy": "greedy_batch",
+    "greedy": {
+        # TDT graphs are only implemented by the label-looping decoder
+        "loop_labels": True,
+        "use_cuda_graph_decoder": True,
+        "max_symbols": 10,
+    },
+}
+
+_BEAM_DECODING: Final[dict] = {
+    **_TDT_BASE,
+    "strategy": "beam",
+    "beam": {
+        "return_best_hypothesis": True,
+        "score_norm": True,
+        # TDT beam search parameters
+        "tsd_max_sym_exp": 50,
+        "alsd_max_target_len": 2.0,
+    },
+}
+
+
+def _greedy_decoding_cfg():
+    """TDT greedy_batch config using NeMo's CUDA graph decoder."""
+    from omegaconf import OmegaConf
+
+    return OmegaConf.create(_GREEDY_DECODING)
+
+
+def _beam_decoding_cfg(settings: Settings):
+    """TDT beam config - the known-stable fallback when CUDA graphs fail."""
+    from omegaconf import OmegaConf
+
+    return OmegaConf.create({
+        **_BEAM_DECODING,
+        "beam": {**_BEAM_DECODING["beam"], "beam_size": settings.beam_size},
+    })
+
+
+def _warmup_decoder(model: "ASRModel") -> None:
+    """
+    Transcribe one second of silence a few times.
+
+    Surfaces CUDA graph capture failures at load time (where we can still
+    fall back) instead of on the first real call.
+    """
+    # Same path as real calls, so the graphs are captured as they'll run
+    silence = torch.zeros(ASR_SAMPLE_RATE)
+    for _ in range(DECODER_WARMUP_ITERATIONS):
+        _transcribe_waveforms(model, [silence])
+
+
+def _reserve_asr_memory(model: "ASRModel") -> None:
+    """
+    Run the encoder once on the longest input it takes in one pass.
+
+    No input is longer than MAX_AUDIO_DURATION_SECONDS (longer calls are
+    chunked), so this reserves up front the blocks any single input needs.
+    Batched passes need more than this; _chunk_batch_size() caps them to
+    the VRAM free at the time.
+
+    Runs on the ASR stream from model_streams(): the caching allocator only
+    hands a cached block back out on the stream that allocated it.
+    """
+    asr_stream = model_streams()[0]
+    num_samples = MAX_AUDIO_DURATION_SECONDS * ASR_SAMPLE_RATE
+
+    with torch.cuda.stream(asr_stream), _gpu_inference():
+        signal = torch.zeros(1, num_samples, device=model.device)
+        length = torch.tensor([num_samples], device=model.device)
+        features, feature_lengths = model.preprocessor(input_signal=signal, length=length)
+        model.encoder(audio_signal=features, length=feature_lengths)
+    asr_stream.synchronize()
+
+    reserved_gb = torch.cuda.memory_reserved(model.device) / (1024**3)
+    logger.info(f"ASR memory reserved for {MAX_AUDIO_DURATION_SECONDS}s inputs ({reserved_gb:.2f}GB cached)")
+
 
 def load_asr_model(settings: Settings) -> "ASRModel":
     """
-    Load Parakeet TDT model with beam decoding.
+    Load Parakeet TDT model with CUDA graph greedy decoding.
 
     CRITICAL FIXES APPLIED:
     1. Uses ASRModel.from_pretrained() factory - NOT the specific model class
-    2. Beam decoding (beam_size=1) - fixes CUDA graph failures on RTX 3090
+    2. greedy_batch with the CUDA graph decoder, warmed up before first use;
+       falls back to beam decoding (beam_size=1) if capture fails, which is
+       the RTX 3090 "CUDA failure! 35" workaround
     3. TDT-specific durations config for Token-and-Duration Transducer
 
     Args:
@@ -72,31 +208,27 @@ def load_asr_model(settings: Settings) -> "ASRModel":
         model.eval()
         logger.info("ASR model loaded and moved to CUDA")
 
+        # Decoder-independent, so it runs before the strategy is chosen
+        _reserve_asr_memory(model)
+
         # =================================================================
-        # CRITICAL FIX #2: Beam decoding strategy
-        # The default greedy_batch uses CUDA graphs which fail on RTX 3090
-        # with "CUDA failure! 35" error. Beam decoding bypasses this.
+        # CRITICAL FIX #2: Decoding strategy
+        # greedy_batch with CUDA graphs removes per-step kernel launch
+        # overhead (~3x faster than beam). Some setups (RTX 3090) fail graph
+        # capture with "CUDA failure! 35", so the warmup runs here and any
+        # failure drops back to beam decoding, which bypasses CUDA graphs.
         # =================================================================
-        decoding_cfg = OmegaConf.create({
-            "strategy": settings.decoding_strategy,
-            "model_type": "tdt",
-            # TDT-specific: duration buckets for Token-and-Duration Transducer
-            "durations": [0, 1, 2, 3, 4],
-            "beam": {
-                "beam_size": settings.beam_size,
-                "return_best_hypothesis": True,
-                "score_norm": True,
-                # TDT beam search parameters
-                "tsd_max_sym_exp": 50,
-                "alsd_max_target_len": 2.0,
-            },
-        })
-
-        model.change_decoding_strategy(decoding_cfg)
-        logger.info(
-            f"Decoding strategy configured: {settings.decoding_strategy} "
-            f"(beam_size={settings.beam_size})"
-        )
+        if settings.decoding_strategy == "greedy_batch":
+            try:
+                model.change_decoding_strategy(_greedy_decoding_cfg())
+                _warmup_decoder(model)
+                logger.info("Decoding strategy configured: greedy_batch (CUDA graphs)")
+                return model
+            except Exception as e:
+                logger.warning(f"CUDA graph greedy decoding failed, falling back to beam: {e}")
+
+        model.change_decoding_strategy(_beam_decoding_cfg(settings))
+        logger.info(f"Decoding strategy configured: beam (beam_size={settings.beam_size})")
 
         return model
 
@@ -105,6 +237,68 @@ def load_asr_model(settings: Settings) -> "ASRModel":
         raise RuntimeError(f"ASR model loading failed: {e}") from e
 
 
+def _capture_segmentation_graph(pipeline: "Pipeline") -> None:
+    """
+    Replay pyannote's segmentation model from a CUDA graph.
+
+    Segmentation runs the model on fixed-length chunks (10s for 3.1) in
+    batches of segmentation_batch_size, so every full batch has the same
+    shape and is launch-bound rather than compute-bound. The model's
+    forward is replaced with one that replays a graph captured at that
+    shape; any other input (the final partial batch of a file) runs eager.
+
+    Raises:
+        Exception: If warmup or capture fails (caller keeps the eager model)
+    """
+    segmentation = pipeline._segmentation
+    model = segmentation.model
+    num_samples = round(segmentation.duration * model.hparams.sample_rate)
+
+    eager_forward = model.forward
+    static_input = torch.zeros(
+        segmentation.batch_size, model.hparams.num_channels, num_samples, device=model.device
+    )
+
+    # Same precision as _diarize_single so kernels match, but with the
+    # autocast weight cache off: cached bf16 weight copies are freed when
+    # the autocast block exits, and the graph would keep reading them
+    with torch.inference_mode(), torch.autocast(
+        device_type="cuda", dtype=AUTOCAST_DTYPE, cache_enabled=False
+    ):
+        # Warm up on a side stream, as torch.cuda.graph requires
+        warmup_stream = torch.cuda.Stream()
+        warmup_stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(warmup_stream):
+            for _ in range(SEGMENTATION_WARMUP_ITERATIONS):
+                eager_forward(static_input)
+        torch.cuda.current_stream().wait_stream(warmup_stream)
+
+        # thread_local: the ASR model loads in parallel (ensure_models), and
+        # its CUDA calls must not be treated as part of this capture
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph, capture_error_mode="thread_local"):
+            static_output = eager_forward(static_input)
+
+    if not isinstance(static_output, torch.Tensor):
+        raise TypeError(f"Unsupported segmentation output: {type(static_output).__name__}")
+
+    def graphed_forward(waveforms: torch.Tensor, *args, **kwargs) -> torch.Tensor:
+        if (
+            args
+            or kwargs
+            or waveforms.shape != static_input.shape
+            or waveforms.dtype != static_input.dtype
+            or waveforms.device != static_input.device
+        ):
+            return eager_forward(waveforms, *args, **kwargs)
+        static_input.copy_(waveforms)
+        graph.replay()
+        # Outputs live in the graph's pool and are overwritten on next replay
+        return static_output.clone()
+
+    model.forward = graphed_forward
+
+
 def load_diarization_pipeline(settings: Settings) -> "Pipeline":
     """
     Load Pyannote speaker diarization pipeline.
@@ -125,7 +319,7 @@ def load_diarization_pipeline(settings: Settings) -> "Pipeline":
 
     try:
         # =================================================================
-        # NOTE: Pyannote 3.x uses 'token' parameter
+        # NOTE: Pyannote 4.x uses 'token' parameter
         # The deprecated 'use_auth_token' will cause warnings/errors
         # =================================================================
         pipeline = Pipeline.from_pretrained(
@@ -135,6 +329,21 @@ def load_diarization_pipeline(settings: Settings) -> "Pipeline":
         pipeline.to(torch.device("cuda"))
         logger.info("Diarization pipeline loaded and moved to CUDA")
 
+        # Smaller batches than pyannote's default (32) - see Settings
+        pipeline.segmentation_batch_size = settings.diarization_segmentation_batch_size
+        pipeline.embedding_batch_size = settings.diarization_embedding_batch_size
+        logger.info(
+            f"Diarization batch sizes: segmentation={pipeline.segmentation_batch_size}, "
+            f"embedding={pipeline.embedding_batch_size}"
+        )
+
+        # Must follow the batch size change: the graph is captured at it
+        try:
+            _capture_segmentation_graph(pipeline)
+            logger.info("Diarization segmentation running from a CUDA graph")
+        except Exception as e:
+            logger.warning(f"Segmentation CUDA graph capture failed ({e}) - running eager")
+
         return pipeline
 
     except Exception as e:
@@ -180,16 +389,11 @@ def get_gpu_memory_free() -> float:
     if not torch.cuda.is_available():
         return 0.0
 
-    # Force synchronization to get accurate reading
-    torch.cuda.synchronize()
-
-    # Get memory info
-    total = torch.cuda.get_device_properties(0).total_memory
-    allocated = torch.cuda.memory_allocated(0)
-    reserved = torch.cuda.memory_reserved(0)
-
-    # Free memory is total minus reserved (reserved includes allocated)
-    free = (total - reserved) / (1024**3)
+    # Free at the driver level, plus blocks the caching allocator holds but
+    # has not handed out - those are reused without a cudaMalloc
+    driver_free, _ = torch.cuda.mem_get_info(0)
+    cached_unused = torch.cuda.memory_reserved(0) - torch.cuda.memory_allocated(0)
+    free = (driver_free + cached_unused) / (1024**3)
 
     return round(free, 2)
 
@@ -208,10 +412,8 @@ def check_memory_for_processing(audio_duration_seconds: float, min_free_gb: floa
     Returns:
         True if safe to proceed, False if memory too low
     """
-    # Clear any cached memory first
-    torch.cuda.empty_cache()
-    gc.collect()
-
+    # Counts cached-but-unused blocks as free, so the cache need not be
+    # emptied (a device-wide sync) before every call
     free_gb = get_gpu_memory_free()
 
     # Estimate memory requirement based on duration
@@ -238,16 +440,60 @@ def check_memory_for_processing(audio_duration_seconds: float, min_free_gb: floa
 # AUDIO UTILITIES
 # =============================================================================
 
-def get_audio_duration(audio_path: str) -> float:
+# Audio accepted by transcribe()/diarize(): a file path, or a mono 16kHz
+# waveform as returned by load_audio()
+Audio = str | torch.Tensor
+
+
+def load_audio(source: str | BinaryIO) -> torch.Tensor:
     """
-    Get duration of audio file in seconds using ffprobe.
+    Decode audio in-process to a mono 16kHz float32 waveform.
+
+    Replaces the ffmpeg subprocess + temp WAV round trip: torchaudio decodes
+    the file directly and the resample runs on the GPU.
 
     Args:
-        audio_path: Path to audio file
+        source: Path or file-like object with encoded audio (mp3, wav, ...)
+
+    Returns:
+        1-D float32 CPU tensor sampled at ASR_SAMPLE_RATE
+    """
+    import torchaudio
+
+    waveform, sample_rate = torchaudio.load(source)
+    waveform = waveform.mean(dim=0)  # Downmix to mono
+
+    if sample_rate != ASR_SAMPLE_RATE:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        waveform = torchaudio.functional.resample(
+            waveform.to(device), sample_rate, ASR_SAMPLE_RATE
+        ).cpu()
+
+    return waveform.contiguous()
+
+
+def _as_waveform(audio: Audio) -> torch.Tensor:
+    """Return `audio` as a mono 16kHz waveform, decoding it if it is a path."""
+    if isinstance(audio, torch.Tensor):
+        return audio
+    return load_audio(audio)
+
+
+def get_audio_duration(audio: Audio) -> float:
+    """
+    Get duration of audio in seconds.
+
+    Waveforms are measured directly; files are probed with ffprobe.
+
+    Args:
+        audio: Path to audio file, or waveform from load_audio()
 
     Returns:
         Duration in seconds
     """
+    if isinstance(audio, torch.Tensor):
+        return audio.numel() / ASR_SAMPLE_RATE
+
     try:
         result = subprocess.run(
             [
@@ -255,7 +501,7 @@ def get_audio_duration(audio_path: str) -> float:
                 "-v", "error",
                 "-show_entries", "format=duration",
                 "-of", "default=noprint_wrappers=1:nokey=1",
-                audio_path,
+                audio,
             ],
             capture_output=True,
             text=True,
@@ -268,123 +514,128 @@ def get_audio_duration(audio_path: str) -> float:
         return 0.0
 
 
-def split_audio_into_chunks(
-    audio_path: str,
+def split_waveform_into_chunks(
+    waveform: torch.Tensor,
     chunk_duration: float = CHUNK_DURATION_SECONDS,
     overlap: float = CHUNK_OVERLAP_SECONDS,
-) -> list[str]:
+) -> list[torch.Tensor]:
     """
-    Split audio file into smaller chunks using ffmpeg.
+    Split a waveform into overlapping chunks.
+
+    Chunks are views into `waveform`, so nothing is copied or written to disk.
 
     Args:
-        audio_path: Path to source audio file
+        waveform: Mono 16kHz waveform from load_audio()
         chunk_duration: Duration of each chunk in seconds
         overlap: Overlap between chunks in seconds
 
     Returns:
-        List of paths to chunk files (caller must clean up)
+        List of chunk waveforms
     """
-    duration = get_audio_duration(audio_path)
-    if duration <= 0:
-        logger.warning("Could not determine audio duration, returning original file")
-        return [audio_path]
+    total = waveform.numel()
+    chunk_samples = int(chunk_duration * ASR_SAMPLE_RATE)
+    step = int((chunk_duration - overlap) * ASR_SAMPLE_RATE)  # How far to advance for each chunk
 
-    chunk_paths = []
-    temp_dir = tempfile.mkdtemp(prefix="callscript_chunks_")
+    chunks = [waveform[start:start + chunk_samples] for start in range(0, total, step)]
 
-    start_time = 0.0
-    chunk_index = 0
-    step = chunk_duration - overlap  # How far to advance for each chunk
+    logger.info(f"Split audio into {len(chunks)} chunks ({chunk_duration}s each, {overlap}s overlap)")
+    return chunks
 
-    while start_time < duration:
-        chunk_path = os.path.join(temp_dir, f"chunk_{chunk_index:03d}.wav")
 
-        # Calculate chunk end time
-        end_time = min(start_time + chunk_duration, duration)
-        chunk_length = end_time - start_time
+# Silero VAD: (model, get_speech_timestamps) from load_vad_model()
+VadModel = tuple
 
-        try:
-            subprocess.run(
-                [
-                    "ffmpeg",
-                    "-y",
-                    "-i", audio_path,
-                    "-ss", str(start_time),
-                    "-t", str(chunk_length),
-                    "-ac", "1",
-                    "-ar", "16000",
-                    chunk_path,
-                ],
-                check=True,
-                capture_output=True,
-            )
-            chunk_paths.append(chunk_path)
-            logger.debug(f"Created chunk {chunk_index}: {start_time:.1f}s - {end_time:.1f}s")
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to create chunk {chunk_index}: {e}")
-            # Clean up any chunks created so far
-            cleanup_chunk_files(chunk_paths, temp_dir)
-            raise RuntimeError(f"Audio chunking failed: {e}")
-
-        start_time += step
-        chunk_index += 1
-
-    logger.info(f"Split audio into {len(chunk_paths)} chunks ({chunk_duration}s each, {overlap}s overlap)")
-    return chunk_paths
-
-
-def cleanup_chunk_files(chunk_paths: list[str], temp_dir: str = None) -> None:
-    """
-    Remove temporary chunk files and directory.
+# torch.hub runs the repo's hubconf.py in-process, so pin a release tag
+# rather than tracking the default branch
+SILERO_VAD_REPO = "snakers4/silero-vad:v5.1"
 
-    Args:
-        chunk_paths: List of chunk file paths
-        temp_dir: Temporary directory to remove (optional)
+
+def load_vad_model() -> VadModel:
     """
-    for path in chunk_paths:
-        try:
-            if path and os.path.exists(path):
-                os.remove(path)
-        except OSError as e:
-            logger.warning(f"Failed to remove chunk {path}: {e}")
+    Load the Silero VAD model used for silence-based chunking.
 
-    if temp_dir and os.path.exists(temp_dir):
-        try:
-            os.rmdir(temp_dir)
-        except OSError:
-            pass  # Directory not empty or other error
+    Fetched via torch.hub at the SILERO_VAD_REPO tag (cached under
+    ~/.cache/torch/hub after the first download) and run on the CPU - it is tiny, and keeps the GPU for ASR.
 
+    Returns:
+        (model, get_speech_timestamps) for split_waveform_on_silence()
+
+    Raises:
+        RuntimeError: If the model cannot be loaded
+    """
+    logger.info("Loading Silero VAD model")
+    try:
+        model, utils = torch.hub.load(SILERO_VAD_REPO, "silero_vad", trust_repo=True)
+    except Exception as e:
+        logger.error(f"Failed to load Silero VAD: {e}")
+        raise RuntimeError(f"VAD model loading failed: {e}") from e
+
+    get_speech_timestamps = utils[0]
+    return model, get_speech_timestamps
 
-# =============================================================================
-# TRANSCRIPTION
-# =============================================================================
 
-def _transcribe_single(model: "ASRModel", audio_path: str) -> str:
+def split_waveform_on_silence(
+    waveform: torch.Tensor,
+    vad: VadModel,
+    max_chunk_duration: float = CHUNK_DURATION_SECONDS,
+) -> list[torch.Tensor]:
     """
-    Transcribe a single audio file (internal function).
+    Split a waveform into speech-only chunks cut at pauses.
+
+    Consecutive speech spans are grouped while the group fits in
+    max_chunk_duration; silence between groups (and at either end) is
+    dropped. Chunks never overlap, so their transcripts just concatenate.
+    A single unbroken span longer than a chunk is cut at fixed points.
 
     Args:
-        model: Loaded ASR model
-        audio_path: Path to 16kHz mono WAV file
+        waveform: Mono 16kHz waveform from load_audio()
+        vad: Model from load_vad_model()
+        max_chunk_duration: Longest chunk in seconds
 
     Returns:
-        Transcript text
+        List of chunk waveforms (views into `waveform`); empty if no speech
     """
-    # =================================================================
-    # CRITICAL FIX #3: API parameters
-    # - Use 'audio=' not 'paths2audio_files=' (NeMo 2.x API)
-    # - Use return_hypotheses=True (required for TDT text extraction)
-    # =================================================================
-    hypotheses = model.transcribe(
-        audio=[audio_path],
-        return_hypotheses=True,
+    model, get_speech_timestamps = vad
+    with torch.inference_mode():
+        spans = get_speech_timestamps(waveform, model, sampling_rate=ASR_SAMPLE_RATE)
+
+    max_samples = int(max_chunk_duration * ASR_SAMPLE_RATE)
+    chunks = []
+    chunk_start = chunk_end = None
+
+    for span in spans:
+        start, end = span["start"], span["end"]
+
+        # Same chunk while it still fits
+        if chunk_start is not None and end - chunk_start <= max_samples:
+            chunk_end = end
+            continue
+
+        if chunk_start is not None:
+            chunks.append(waveform[chunk_start:chunk_end])
+
+        while end - start > max_samples:
+            chunks.append(waveform[start:start + max_samples])
+            start += max_samples
+        chunk_start, chunk_end = start, end
+
+    if chunk_start is not None:
+        chunks.append(waveform[chunk_start:chunk_end])
+
+    speech_seconds = sum(c.numel() for c in chunks) / ASR_SAMPLE_RATE
+    logger.info(
+        f"VAD split audio into {len(chunks)} chunks "
+        f"({speech_seconds:.1f}s of {waveform.numel() / ASR_SAMPLE_RATE:.1f}s kept)"
     )
+    return chunks
 
-    if not hypotheses or len(hypotheses) == 0:
-        return ""
 
-    hypothesis = hypotheses[0]
+# =============================================================================
+# TRANSCRIPTION
+# =============================================================================
 
+def _hypothesis_text(hypothesis) -> str:
+    """Extract transcript text from a NeMo decoding result item."""
     # Handle different return types from various NeMo versions
     if hasattr(hypothesis, "text"):
         return hypothesis.text
@@ -394,78 +645,366 @@ def _transcribe_single(model: "ASRModel", audio_path: str) -> str:
         return str(hypothesis)
 
 
-def transcribe(model: "ASRModel", audio_path: str) -> str:
+def _decode_waveforms(model: "ASRModel", waveforms: list[torch.Tensor]) -> list:
     """
-    Transcribe audio file using loaded ASR model.
+    Decode a batch of waveforms to NeMo hypotheses (internal function).
 
-    For long audio files (>10 minutes), automatically splits into chunks
-    to prevent CUDA OOM errors on RTX 3090.
+    Runs the model's own stages directly instead of model.transcribe(), which
+    is built for files: it re-reads audio through a CPU dataloader and
+    computes features on the CPU. Here the padded batch is copied to the GPU
+    once and the mel featurizer (STFT), encoder and decoder all run there.
 
-    CRITICAL: Must use return_hypotheses=True for TDT models.
-    The 'audio' parameter is the NeMo 2.x API (not 'paths2audio_files').
+    Args:
+        model: Loaded ASR model
+        waveforms: Mono 16kHz waveforms
+
+    Returns:
+        Hypothesis per waveform, in the same order
+    """
+    device = model.device
+    lengths = torch.tensor([w.numel() for w in waveforms], device=device)
+    batch = torch.nn.utils.rnn.pad_sequence(waveforms, batch_first=True).to(device)
+
+    with _gpu_inference():
+        features, feature_lengths = model.preprocessor(input_signal=batch, length=lengths)
+        encoded, encoded_lengths = model.encoder(audio_signal=features, length=feature_lengths)
+        # =============================================================
+        # CRITICAL FIX #3: return_hypotheses=True (required for TDT
+        # text extraction)
+        # =============================================================
+        hypotheses = model.decoding.rnnt_decoder_predictions_tensor(
+            encoder_output=encoded,
+            encoded_lengths=encoded_lengths,
+            return_hypotheses=True,
+        )
+
+    # Older NeMo returns (best_hypotheses, all_hypotheses)
+    if isinstance(hypotheses, tuple):
+        hypotheses = hypotheses[0]
+
+    hypotheses = list(hypotheses or [])
+    if len(hypotheses) != len(waveforms):
+        raise RuntimeError(f"Decoding returned {len(hypotheses)} results for {len(waveforms)} inputs")
+    return hypotheses
+
+
+def _transcribe_waveforms(model: "ASRModel", waveforms: list[torch.Tensor]) -> list[str]:
+    """
+    Transcribe a batch of waveforms (internal function).
+
+    Args:
+        model: Loaded ASR model
+        waveforms: Mono 16kHz waveforms
+
+    Returns:
+        Transcript text per waveform, in the same order
+    """
+    return [_hypothesis_text(h) for h in _decode_waveforms(model, waveforms)]
+
+
+def _transcribe_single(model: "ASRModel", waveform: torch.Tensor) -> str:
+    """
+    Transcribe a single waveform (internal function).
+
+    Args:
+        model: Loaded ASR model
+        waveform: Mono 16kHz waveform
+
+    Returns:
+        Transcript text
+    """
+    return _transcribe_waveforms(model, [waveform])[0]
+
+
+def _chunk_batch_size(num_chunks: int, seconds: float = CHUNK_DURATION_SECONDS) -> int:
+    """
+    How many inputs to transcribe per forward pass, from free VRAM.
+
+    Args:
+        num_chunks: Inputs waiting to be transcribed
+        seconds: Length of the longest of them
+
+    Returns:
+        Batch size between 1 and num_chunks
+    """
+    free_gb = get_gpu_memory_free() - CHUNK_BATCH_RESERVE_GB
+    gb_per_input = CHUNK_BATCH_GB_PER_CHUNK * seconds / CHUNK_DURATION_SECONDS
+    return max(1, min(num_chunks, int(free_gb / gb_per_input)))
+
+
+def _length_buckets(waveforms: list[torch.Tensor], max_batch_size: int | None = None) -> list[list[int]]:
+    """
+    Group waveforms into batches of similar length, longest first.
+
+    A padded batch costs its longest input times its size, so mixing a
+    30s call with a 10-minute one spends most of the pass on padding.
+    Sorting by length and cutting a new batch once inputs drop below
+    LENGTH_BUCKET_RATIO of the batch's longest keeps padding bounded.
+
+    Args:
+        waveforms: Inputs to batch
+        max_batch_size: Cap on inputs per batch (None = no cap)
+
+    Returns:
+        Batches as lists of indices into `waveforms`
+    """
+    order = sorted(range(len(waveforms)), key=lambda i: waveforms[i].numel(), reverse=True)
+
+    buckets = []
+    for i in order:
+        if (
+            buckets
+            and waveforms[i].numel() >= waveforms[buckets[-1][0]].numel() * LENGTH_BUCKET_RATIO
+            and (max_batch_size is None or len(buckets[-1]) < max_batch_size)
+        ):
+            buckets[-1].append(i)
+        else:
+            buckets.append([i])
+    return buckets
+
+
+def _decode_chunk_batch(
+    model: "ASRModel",
+    chunks: list[torch.Tensor],
+    chunk_numbers: list[int],
+) -> list:
+    """
+    Decode a batch of chunks, falling back to one at a time.
+
+    A failed chunk yields None so positions still line up for the merge.
+
+    Args:
+        model: Loaded ASR model
+        chunks: Chunks of one waveform
+        chunk_numbers: 1-based position of each chunk in the call (for logs)
+
+    Returns:
+        Hypothesis (or None) per chunk, in the same order
+    """
+    if len(chunks) > 1:
+        try:
+            return _decode_waveforms(model, chunks)
+        except Exception as e:
+            logger.warning(f"Batched chunk transcription failed ({e}) - retrying one at a time")
+            torch.cuda.empty_cache()
+
+    hypotheses = []
+    for i, chunk in zip(chunk_numbers, chunks):
+        try:
+            hypothesis = _decode_waveforms(model, [chunk])[0]
+            hypotheses.append(hypothesis)
+            logger.debug(f"Chunk {i} transcribed: {len(_hypothesis_text(hypothesis))} chars")
+        except Exception as e:
+            logger.error(f"Failed to transcribe chunk {i}: {e}")
+            hypotheses.append(None)  # Keep position for merge
+    return hypotheses
+
+
+def _decode_chunks(model: "ASRModel", chunks: list[torch.Tensor]) -> list:
+    """
+    Decode chunks in similar-length batches sized to the free VRAM.
+
+    Returns:
+        Hypothesis (or None if it failed) per chunk, in the same order
+    """
+    hypotheses = [None] * len(chunks)
+    for bucket in _length_buckets(chunks, _chunk_batch_size(len(chunks))):
+        numbers = [i + 1 for i in bucket]
+        logger.info(f"Transcribing chunks {numbers} of {len(chunks)}...")
+        batch = _decode_chunk_batch(model, [chunks[i] for i in bucket], numbers)
+        for i, hypothesis in zip(bucket, batch):
+            hypotheses[i] = hypothesis
+    return hypotheses
+
+
+def transcribe(model: "ASRModel", audio: Audio, vad: VadModel | None = None) -> str:
+    """
+    Transcribe audio using loaded ASR model.
+
+    For long audio (>10 minutes), automatically splits into chunks
+    to prevent CUDA OOM errors on RTX 3090: at pauses found by `vad` when
+    given, otherwise fixed, overlapping chunks.
+
+    CRITICAL: Must use return_hypotheses=True for TDT models
+    (see _transcribe_waveforms).
 
     Args:
         model: Loaded ASR model from load_asr_model()
-        audio_path: Path to 16kHz mono WAV file
+        audio: Path to audio file, or waveform from load_audio()
+        vad: Optional model from load_vad_model()
 
     Returns:
         Transcript text (may be empty for silent audio)
     """
-    # Check audio duration
-    duration = get_audio_duration(audio_path)
+    waveform = _as_waveform(audio)
+    duration = get_audio_duration(waveform)
 
     # Short audio: transcribe directly
     if duration <= MAX_AUDIO_DURATION_SECONDS:
         logger.debug(f"Audio duration {duration:.1f}s <= {MAX_AUDIO_DURATION_SECONDS}s, transcribing directly")
-        return _transcribe_single(model, audio_path)
+        return _transcribe_single(model, waveform)
 
     # Long audio: use chunking strategy
     logger.info(f"Long audio detected ({duration:.1f}s), using chunking strategy")
 
-    chunk_paths = []
-    temp_dir = None
+    # Chunk batches are sized to the free VRAM (_chunk_batch_size), so the
+    # cache is not emptied between them
+    if vad is not None:
+        # Cut at pauses: no overlap, so no dedup needed at the boundaries
+        chunks = split_waveform_on_silence(waveform, vad)
+        texts = [_hypothesis_text(h).strip() for h in _decode_chunks(model, chunks) if h is not None]
+        merged = " ".join(text for text in texts if text)
+        logger.info(f"Joined {len(chunks)} VAD chunks into {len(merged)} chars")
+        return merged
 
-    try:
-        # Split into chunks
-        chunk_paths = split_audio_into_chunks(
-            audio_path,
-            chunk_duration=CHUNK_DURATION_SECONDS,
-            overlap=CHUNK_OVERLAP_SECONDS,
-        )
+    chunks = split_waveform_into_chunks(
+        waveform,
+        chunk_duration=CHUNK_DURATION_SECONDS,
+        overlap=CHUNK_OVERLAP_SECONDS,
+    )
+    with _word_timestamps(model):
+        hypotheses = _decode_chunks(model, chunks)
 
-        if chunk_paths:
-            temp_dir = str(Path(chunk_paths[0]).parent)
+    # Merge transcripts at the middle of each overlap using word timestamps,
+    # or by matching overlapping words when timestamps are unavailable
+    merged = _merge_chunk_hypotheses(model, hypotheses)
+    logger.info(f"Merged {len(chunks)} chunks into {len(merged)} chars")
 
-        # Transcribe each chunk
-        transcripts = []
-        for i, chunk_path in enumerate(chunk_paths):
-            logger.info(f"Transcribing chunk {i + 1}/{len(chunk_paths)}...")
+    return merged
 
-            try:
-                chunk_text = _transcribe_single(model, chunk_path)
-                transcripts.append(chunk_text)
-                logger.debug(f"Chunk {i + 1} transcribed: {len(chunk_text)} chars")
-            except Exception as e:
-                logger.error(f"Failed to transcribe chunk {i + 1}: {e}")
-                transcripts.append("")  # Keep position for merge
 
-            # CRITICAL: Clear VRAM between chunks to prevent accumulation
-            torch.cuda.empty_cache()
-            gc.collect()
+def transcribe_batch(
+    model: "ASRModel",
+    audios: list[Audio],
+    vad: VadModel | None = None,
+) -> list[str]:
+    """
+    Transcribe several audio inputs, batching the short ones.
 
-        # Merge transcripts
-        # Simple concatenation with space - overlap handles word boundaries
-        merged = _merge_chunk_transcripts(transcripts)
-        logger.info(f"Merged {len(chunk_paths)} chunks into {len(merged)} chars")
+    Inputs up to MAX_AUDIO_DURATION_SECONDS go through batched forward
+    passes, grouped by length to limit padding (see _length_buckets) and
+    sized to the free VRAM (see _chunk_batch_size) - Parakeet's encoder is
+    underutilized at batch size 1. Longer inputs use the chunked path in
+    transcribe().
 
-        return merged
+    Args:
+        model: Loaded ASR model from load_asr_model()
+        audios: Paths to audio files, or waveforms from load_audio()
+        vad: Optional model from load_vad_model(), for the chunked path
+
+    Returns:
+        Transcript text per input, in the same order
+    """
+    waveforms = [_as_waveform(audio) for audio in audios]
+    short = [
+        i for i, waveform in enumerate(waveforms)
+        if get_audio_duration(waveform) <= MAX_AUDIO_DURATION_SECONDS
+    ]
+
+    texts = {}
+    short_waveforms = [waveforms[i] for i in short]
+    longest = max((get_audio_duration(w) for w in short_waveforms), default=0.0)
+    max_batch_size = _chunk_batch_size(len(short), longest) if longest > 0 else None
+    for bucket in _length_buckets(short_waveforms, max_batch_size):
+        indices = [short[i] for i in bucket]
+        batch_texts = _transcribe_waveforms(model, [waveforms[i] for i in indices])
+        texts.update(zip(indices, batch_texts))
+
+    return [
+        texts[i] if i in texts else transcribe(model, waveform, vad)
+        for i, waveform in enumerate(waveforms)
+    ]
+
+
+def _encoder_frame_seconds(model: "ASRModel") -> float | None:
+    """Seconds per encoder output frame (the unit of word offsets), if known."""
+    try:
+        return model.cfg.preprocessor.window_stride * model.cfg.encoder.subsampling_factor
+    except Exception:
+        return None
+
+
+def _hypothesis_words(hypothesis, frame_seconds: float) -> list[tuple[str, float]] | None:
+    """
+    (word, start seconds within the chunk) pairs from a hypothesis.
+
+    Returns:
+        Word list, or None if the hypothesis carries no word timestamps
+    """
+    # NeMo 2.x calls it `timestamp`; older releases `timestep`
+    timestamps = getattr(hypothesis, "timestamp", None) or getattr(hypothesis, "timestep", None)
+    if not isinstance(timestamps, dict) or "word" not in timestamps:
+        return None
+    return [(w["word"], w["start_offset"] * frame_seconds) for w in timestamps["word"]]
+
+
+@contextmanager
+def _word_timestamps(model: "ASRModel"):
+    """
+    Have the decoder attach word offsets to hypotheses inside the block.
 
+    Only the overlapping-chunk merge needs them, so they are switched on
+    around those decodes rather than in the decoding config, which would
+    pay for them on every call. Toggling the flag leaves the decoder (and
+    its CUDA graphs) as built.
+    """
+    previous = getattr(model.decoding, "compute_timestamps", None)
+    model.decoding.compute_timestamps = True
+    try:
+        yield
     finally:
-        # Always clean up chunk files
-        if chunk_paths:
-            cleanup_chunk_files(chunk_paths, temp_dir)
-        torch.cuda.empty_cache()
-        gc.collect()
+        model.decoding.compute_timestamps = previous
+
+
+def _merge_chunk_hypotheses(model: "ASRModel", hypotheses: list) -> str:
+    """
+    Merge chunk hypotheses from split_waveform_into_chunks() into one text.
+
+    With word timestamps, each chunk owns the audio between the midpoints
+    of its overlaps with its neighbours, and keeps only words starting
+    there - no text matching, so rephrasing near a boundary can't cause a
+    missed or wrong dedup. Otherwise falls back to _merge_chunk_transcripts.
+
+    Args:
+        model: ASR model the hypotheses came from
+        hypotheses: Hypothesis per chunk, None for chunks that failed
+
+    Returns:
+        Merged transcript text
+    """
+    frame_seconds = _encoder_frame_seconds(model)
+    chunk_words = []
+    for hypothesis in hypotheses:
+        if hypothesis is None:
+            chunk_words.append([])  # Failed chunk contributes no words
+        elif frame_seconds:
+            chunk_words.append(_hypothesis_words(hypothesis, frame_seconds))
+        else:
+            chunk_words.append(None)
+
+    if any(words is None for words in chunk_words):
+        logger.debug("Word timestamps unavailable - merging chunks by overlapping text")
+        return _merge_chunk_transcripts([
+            "" if h is None else _hypothesis_text(h) for h in hypotheses
+        ])
+
+    step = CHUNK_DURATION_SECONDS - CHUNK_OVERLAP_SECONDS
+    half_overlap = CHUNK_OVERLAP_SECONDS / 2
+    last = len(chunk_words) - 1
+
+    kept = []
+    for i, words in enumerate(chunk_words):
+        # Chunk-relative bounds: chunk i starts at i * step seconds
+        owned_from = half_overlap if i > 0 else float("-inf")
+        owned_to = step + half_overlap if i < last else float("inf")
+        kept.extend(word for word, start in words if owned_from <= start < owned_to)
+
+    return " ".join(kept)
+
+
+# Rolling hash parameters for _remove_overlap (Mersenne prime modulus)
+_OVERLAP_HASH_BASE = 1000003
+_OVERLAP_HASH_MOD = (1 << 61) - 1
 
 
 def _merge_chunk_transcripts(transcripts: list[str]) -> str:
@@ -529,21 +1068,32 @@ def _remove_overlap(prev_text: str, current_text: str, max_overlap_words: int =
     if not prev_words or not current_words:
         return current_text
 
-    # Find longest matching suffix of prev in prefix of current
-    best_overlap = 0
-
-    for overlap_len in range(1, min(len(prev_words), len(current_words), max_overlap_words) + 1):
-        # Check if last overlap_len words of prev match first overlap_len words of current
-        prev_suffix = prev_words[-overlap_len:]
-        current_prefix = current_words[:overlap_len]
-
-        # Case-insensitive comparison
-        if [w.lower() for w in prev_suffix] == [w.lower() for w in current_prefix]:
-            best_overlap = overlap_len
-
-    if best_overlap > 0:
-        logger.debug(f"Removed {best_overlap} overlapping words at chunk boundary")
-        return " ".join(current_words[best_overlap:])
+    # Case-insensitive comparison: lowercase each word once
+    prev_lower = [w.lower() for w in prev_words]
+    current_lower = [w.lower() for w in current_words[:max_overlap_words]]
+    max_len = min(len(prev_lower), len(current_lower))
+
+    # Polynomial hashes of every prev suffix and current prefix, in one pass
+    # each, so all candidate lengths are compared in O(max_overlap_words)
+    # rather than one list comparison per length
+    suffix_hashes = [0] * (max_len + 1)
+    prefix_hashes = [0] * (max_len + 1)
+    weight = 1
+    for n in range(1, max_len + 1):
+        suffix_hashes[n] = (suffix_hashes[n - 1] + hash(prev_lower[-n]) * weight) % _OVERLAP_HASH_MOD
+        prefix_hashes[n] = (prefix_hashes[n - 1] * _OVERLAP_HASH_BASE + hash(current_lower[n - 1])) % _OVERLAP_HASH_MOD
+        weight = weight * _OVERLAP_HASH_BASE % _OVERLAP_HASH_MOD
+
+    # Find longest matching suffix of prev in prefix of current - scan from
+    # the longest candidate down so the first match is the answer. Equal
+    # hashes are confirmed word by word to rule out collisions.
+    for overlap_len in range(max_len, 0, -1):
+        if (
+            suffix_hashes[overlap_len] == prefix_hashes[overlap_len]
+            and prev_lower[-overlap_len:] == current_lower[:overlap_len]
+        ):
+            logger.debug(f"Removed {overlap_len} overlapping words at chunk boundary")
+            return " ".join(current_words[overlap_len:])
 
     return current_text
 
@@ -563,18 +1113,21 @@ DIARIZATION_CHUNK_SECONDS = 180  # 3 minutes
 DIARIZATION_OVERLAP_SECONDS = 10
 
 
-def _diarize_single(pipeline: "Pipeline", audio_path: str) -> list[dict]:
+def _diarize_single(pipeline: "Pipeline", waveform: torch.Tensor) -> list[dict]:
     """
-    Run diarization on a single audio file (internal).
+    Run diarization on a single waveform (internal).
 
     Args:
         pipeline: Loaded diarization pipeline
-        audio_path: Path to audio file
+        waveform: Mono 16kHz waveform
 
     Returns:
         List of segments
     """
-    result = pipeline(audio_path)
+    # Pyannote takes in-memory audio as a (channel, time) tensor. Its pipeline
+    # does not disable autograd itself, so do it here to skip the bookkeeping.
+    with _gpu_inference():
+        result = pipeline({"waveform": waveform.unsqueeze(0), "sample_rate": ASR_SAMPLE_RATE})
     segments = []
 
     # Pyannote 4.x returns DiarizeOutput with speaker_diarization attribute
@@ -655,80 +1208,64 @@ def _merge_diarization_segments(
     return merged
 
 
-def diarize(pipeline: "Pipeline", audio_path: str) -> list[dict]:
+def diarize(pipeline: "Pipeline", audio: Audio) -> list[dict]:
     """
-    Run speaker diarization on audio file.
+    Run speaker diarization on audio.
 
-    For long audio files (>5 minutes), automatically splits into chunks
+    For long audio (>5 minutes), automatically splits into chunks
     to prevent CUDA OOM errors. Pyannote diarization is more memory-intensive
     than transcription, so we use smaller chunks.
 
     Args:
         pipeline: Loaded diarization pipeline
-        audio_path: Path to audio file
+        audio: Path to audio file, or waveform from load_audio()
 
     Returns:
         List of segments: [{"start": float, "end": float, "speaker": str}, ...]
     """
-    # Check audio duration
-    duration = get_audio_duration(audio_path)
+    waveform = _as_waveform(audio)
+    duration = get_audio_duration(waveform)
 
     # Short audio: diarize directly
     if duration <= MAX_DIARIZATION_DURATION_SECONDS:
         logger.debug(f"Audio duration {duration:.1f}s <= {MAX_DIARIZATION_DURATION_SECONDS}s, diarizing directly")
-        return _diarize_single(pipeline, audio_path)
+        return _diarize_single(pipeline, waveform)
 
     # Long audio: use chunking strategy
     logger.info(f"Long audio detected ({duration:.1f}s), using chunked diarization")
 
-    chunk_paths = []
-    temp_dir = None
-
-    try:
-        # Split into chunks (smaller than transcription chunks)
-        chunk_paths = split_audio_into_chunks(
-            audio_path,
-            chunk_duration=DIARIZATION_CHUNK_SECONDS,
-            overlap=DIARIZATION_OVERLAP_SECONDS,
-        )
-
-        if chunk_paths:
-            temp_dir = str(Path(chunk_paths[0]).parent)
-
-        # Calculate offsets for each chunk
-        step = DIARIZATION_CHUNK_SECONDS - DIARIZATION_OVERLAP_SECONDS
-        chunk_offsets = [i * step for i in range(len(chunk_paths))]
-
-        # Diarize each chunk
-        all_segments = []
-        for i, chunk_path in enumerate(chunk_paths):
-            logger.info(f"Diarizing chunk {i + 1}/{len(chunk_paths)} (offset: {chunk_offsets[i]:.1f}s)...")
-
-            try:
-                chunk_segments = _diarize_single(pipeline, chunk_path)
-                all_segments.append(chunk_segments)
-                logger.debug(f"Chunk {i + 1} diarized: {len(chunk_segments)} segments")
-            except Exception as e:
-                logger.error(f"Failed to diarize chunk {i + 1}: {e}")
-                all_segments.append([])  # Keep position for merge
+    # Split into chunks (smaller than transcription chunks). Chunks reuse the
+    # allocator's cached blocks; the cache is not emptied afterwards, since
+    # that is device-wide and would also drop the ASR reservation
+    chunks = split_waveform_into_chunks(
+        waveform,
+        chunk_duration=DIARIZATION_CHUNK_SECONDS,
+        overlap=DIARIZATION_OVERLAP_SECONDS,
+    )
 
-            # CRITICAL: Clear VRAM between chunks to prevent OOM
-            torch.cuda.empty_cache()
-            gc.collect()
+    # Calculate offsets for each chunk
+    step = DIARIZATION_CHUNK_SECONDS - DIARIZATION_OVERLAP_SECONDS
+    chunk_offsets = [i * step for i in range(len(chunks))]
 
-        # Merge segments from all chunks
-        merged = _merge_diarization_segments(
-            all_segments,
-            chunk_offsets,
-            DIARIZATION_OVERLAP_SECONDS,
-        )
-        logger.info(f"Merged {len(chunk_paths)} chunks into {len(merged)} segments")
+    # Diarize each chunk
+    all_segments = []
+    for i, chunk in enumerate(chunks):
+        logger.info(f"Diarizing chunk {i + 1}/{len(chunks)} (offset: {chunk_offsets[i]:.1f}s)...")
 
-        return merged
+        try:
+            chunk_segments = _diarize_single(pipeline, chunk)
+            all_segments.append(chunk_segments)
+            logger.debug(f"Chunk {i + 1} diarized: {len(chunk_segments)} segments")
+        except Exception as e:
+            logger.error(f"Failed to diarize chunk {i + 1}: {e}")
+            all_segments.append([])  # Keep position for merge
+
+    # Merge segments from all chunks
+    merged = _merge_diarization_segments(
+        all_segments,
+        chunk_offsets,
+        DIARIZATION_OVERLAP_SECONDS,
+    )
+    logger.info(f"Merged {len(chunks)} chunks into {len(merged)} segments")
 
-    finally:
-        # Always clean up chunk files
-        if chunk_paths:
-            cleanup_chunk_files(chunk_paths, temp_dir)
-        torch.cuda.empty_cache()
-        gc.collect()
+    return merged
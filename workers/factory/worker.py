@@ -13,13 +13,27 @@ This is the refactored version using workers/core modules.
 """
 
 import gc
+import io
 import os
 import signal
-import subprocess
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
+# Must be set before torch initializes CUDA. The worker keeps models resident
+# and never empties the cache between calls, so let the caching allocator grow
+# segments in place and reclaim blocks itself instead of fragmenting. Merged
+# into any value the launcher exported; options it already sets win.
+_ALLOC_CONF = {"expandable_segments": "True", "garbage_collection_threshold": "0.8"}
+_alloc_options = [o for o in os.environ.get("PYTORCH_CUDA_ALLOC_CONF", "").split(",") if o]
+_alloc_options += [
+    f"{key}:{value}" for key, value in _ALLOC_CONF.items()
+    if not any(o.split(":", 1)[0] == key for o in _alloc_options)
+]
+os.environ["PYTORCH_CUDA_ALLOC_CONF"] = ",".join(_alloc_options)
+
 import torch
 from supabase import create_client
 
@@ -31,12 +45,16 @@ from workers.core import (
     setup_logging,
     load_asr_model,
     load_diarization_pipeline,
+    load_vad_model,
     verify_gpu_available,
     get_gpu_memory_free,
     check_memory_for_processing,
     get_audio_duration,
+    load_audio,
     transcribe,
+    transcribe_batch,
     diarize,
+    model_streams,
     align_transcript_with_speakers,
     CallsRepository,
 )
@@ -56,125 +74,253 @@ def signal_handler(sig, frame):
 
 
 # =============================================================================
-# AUDIO PROCESSING
+# MODELS
 # =============================================================================
-def convert_to_wav(input_path: str, output_path: str) -> None:
+# (asr_model, diarizer, vad) once loaded; see ensure_models()
+_models = None
+
+
+def ensure_models(settings) -> tuple:
     """
-    Convert audio to 16kHz mono WAV (required for Parakeet).
+    Load the ASR model, diarization pipeline and (if enabled) VAD on first use.
 
-    Args:
-        input_path: Path to input audio file (mp3, etc.)
-        output_path: Path for output WAV file
+    The worker boots and starts polling without them, so a restart (e.g.
+    after an OOM crash) is back in the loop in seconds instead of waiting
+    on NeMo/pyannote imports and checkpoint loads while the queue is empty.
+
+    Returns:
+        (asr_model, diarizer, vad) - vad is None unless settings.vad_chunking
+
+    Raises:
+        RuntimeError: If any model fails to load
     """
-    subprocess.run(
-        ["ffmpeg", "-y", "-i", input_path, "-ac", "1", "-ar", "16000", output_path],
-        check=True,
-        capture_output=True,
-    )
+    global _models
+    if _models is not None:
+        return _models
 
+    # Both loads are dominated by checkpoint I/O and CUDA setup (GIL released),
+    # so loading them side by side roughly halves cold-start time.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        asr_future = executor.submit(load_asr_model, settings)
+        diarizer_future = executor.submit(load_diarization_pipeline, settings)
 
-def cleanup_files(*paths: str) -> None:
-    """Remove temporary files, ignoring errors."""
-    for path in paths:
-        try:
-            if path and os.path.exists(path):
-                os.remove(path)
-        except OSError as e:
-            logger.warning(f"Failed to remove {path}: {e}")
+    asr_model = asr_future.result()
+    logger.info("ASR model loaded")
+    diarizer = diarizer_future.result()
+    logger.info("Diarization pipeline loaded")
+
+    if settings.compile_asr_encoder:
+        # reduce-overhead captures CUDA graphs per input shape; dynamic=True
+        # keeps varying call lengths from recompiling every batch
+        asr_model.encoder = torch.compile(asr_model.encoder, mode="reduce-overhead", dynamic=True)
+        logger.info("ASR encoder wrapped with torch.compile (compiles on first batch)")
+
+    vad = load_vad_model() if settings.vad_chunking else None
+
+    _models = (asr_model, diarizer, vad)
+    return _models
+
+
+# =============================================================================
+# GPU MEMORY
+# =============================================================================
+def release_gpu_memory_after_oom(error: Exception) -> None:
+    """
+    Return cached VRAM to the driver after a CUDA OOM.
+
+    Only done on OOM: emptying the cache forces a device-wide sync and makes
+    the next call cudaMalloc everything again, so it is not done per call.
+    """
+    if isinstance(error, torch.cuda.OutOfMemoryError):
+        gc.collect()
+        torch.cuda.empty_cache()
 
 
 # =============================================================================
 # MAIN PROCESSING
 # =============================================================================
-def process_call(
-    call: dict,
-    repo: CallsRepository,
-    asr_model,
-    diarizer,
-    settings,
-) -> bool:
+@dataclass(slots=True)
+class PreparedCall:
+    """A locked call whose audio is downloaded and decoded, ready for the GPU."""
+    call_id: str
+    attempt: int  # retry_count after claiming (1..max_retries)
+    waveform: torch.Tensor  # Mono 16kHz, see load_audio()
+    duration: float  # Seconds
+
+
+def fail_call(call_id: str, attempt: int, error: Exception, repo: CallsRepository) -> None:
+    """Log a processing error and mark the call failed/retry."""
+    error_msg = str(error)
+    logger.error(f"Error processing {call_id}: {error_msg[:200]}")
+
+    try:
+        repo.mark_failed(call_id, error_msg, attempt)
+    except Exception as db_error:
+        logger.error(f"Failed to update error status: {db_error}")
+
+
+def prepare_call(call: dict, repo: CallsRepository) -> PreparedCall | None:
     """
-    Process a single call through the transcription pipeline.
+    Download a claimed call's audio and decode it to a 16kHz mono waveform.
 
     Args:
-        call: Call dict with id, storage_path, retry_count
+        call: Claimed call dict with id, storage_path, retry_count
+            (from CallsRepository.claim_pending_calls)
         repo: Database repository
-        asr_model: Loaded ASR model
-        diarizer: Loaded diarization pipeline
-        settings: Application settings
 
     Returns:
-        True if successful, False if failed
+        PreparedCall ready for transcription, or None if the call failed
     """
     call_id = call["id"]
     storage_path = call["storage_path"]
-    retry_count = call.get("retry_count", 0)
-
-    # Setup temp paths
-    tmp_dir = settings.tmp_dir
-    os.makedirs(tmp_dir, exist_ok=True)
-    local_mp3 = os.path.join(tmp_dir, f"{call_id}.mp3")
-    local_wav = os.path.join(tmp_dir, f"{call_id}_mono.wav")
+    attempt = call["retry_count"]
 
     try:
         # -----------------------------------------------------------------
-        # Step 1: Lock the call
+        # Step 1: Lock the call (done by claim_pending_calls)
         # -----------------------------------------------------------------
-        locked = repo.lock_call(call_id, retry_count)
-        if not locked:
-            return False  # Another worker claimed it
-
-        logger.info(f"Processing {call_id}...")
+        logger.info(f"Processing {call_id} (attempt {attempt}/{repo.max_retries})...")
 
         # -----------------------------------------------------------------
         # Step 2: Download audio
         # -----------------------------------------------------------------
         logger.info(f"Downloading: {storage_path}")
         audio_bytes = repo.download_audio(storage_path)
-        with open(local_mp3, "wb") as f:
-            f.write(audio_bytes)
         logger.info(f"Downloaded {len(audio_bytes)} bytes")
 
         # -----------------------------------------------------------------
-        # Step 3: Convert to WAV
+        # Step 3: Decode + resample in-process, straight from memory
         # -----------------------------------------------------------------
-        convert_to_wav(local_mp3, local_wav)
-        logger.info("Converted to 16kHz mono WAV")
+        waveform = load_audio(io.BytesIO(audio_bytes))
+        audio_duration = get_audio_duration(waveform)
+        logger.info(f"Decoded to 16kHz mono waveform ({audio_duration:.1f}s)")
 
-        # -----------------------------------------------------------------
-        # Step 3.5: Memory check before heavy processing
-        # -----------------------------------------------------------------
-        audio_duration = get_audio_duration(local_wav)
-        if audio_duration > 0:
-            logger.info(f"Audio duration: {audio_duration:.1f}s")
-
-            if not check_memory_for_processing(audio_duration):
-                # Memory too low - release lock and let another worker try
-                # or wait for memory to free up
-                logger.warning(
-                    f"Skipping {call_id} due to low GPU memory "
-                    f"(duration: {audio_duration:.1f}s) - will retry later"
-                )
-                # Reset status back to downloaded so it can be picked up again
-                repo.release_call(call_id)
-                return False
+        return PreparedCall(call_id, attempt, waveform, audio_duration)
+
+    except Exception as e:
+        fail_call(call_id, attempt, e, repo)
+        return None
+
+
+def fits_in_gpu_memory(prepared: PreparedCall, repo: CallsRepository) -> bool:
+    """
+    Step 3.5: Memory check before heavy processing.
+
+    Runs right before the GPU stage (not at download time, when the previous
+    batch may still be holding memory). Releases the call if it won't fit.
+    """
+    if prepared.duration <= 0 or check_memory_for_processing(prepared.duration):
+        return True
+
+    # Memory too low - release lock and let another worker try
+    # or wait for memory to free up
+    logger.warning(
+        f"Skipping {prepared.call_id} due to low GPU memory "
+        f"(duration: {prepared.duration:.1f}s) - will retry later"
+    )
+    # Reset status back to downloaded so it can be picked up again
+    repo.release_call(prepared.call_id)
+    return False
+
+
+def transcribe_prepared(asr_model, prepared: list[PreparedCall], vad=None) -> dict[str, str | Exception]:
+    """
+    Transcribe a batch of prepared calls (long calls chunked at pauses if
+    a VAD model is given).
+
+    Tries one batched transcription first; if that fails, falls back to one
+    call at a time so a single bad file cannot fail the whole batch.
+
+    Returns:
+        call_id -> transcript text, or the exception that call failed with
+    """
+    logger.info(f"Starting transcription of {len(prepared)} call(s)...")
+
+    if len(prepared) > 1:
+        try:
+            texts = transcribe_batch(asr_model, [p.waveform for p in prepared], vad)
+            return {p.call_id: text for p, text in zip(prepared, texts)}
+        except Exception as e:
+            logger.warning(f"Batched transcription failed, retrying one at a time: {e}")
+            release_gpu_memory_after_oom(e)
+
+    results = {}
+    for p in prepared:
+        try:
+            results[p.call_id] = transcribe(asr_model, p.waveform, vad)
+        except Exception as e:
+            release_gpu_memory_after_oom(e)
+            results[p.call_id] = e
+    return results
+
+
+def diarize_prepared(
+    diarizer,
+    prepared: list[PreparedCall],
+    stream: torch.cuda.Stream,
+) -> dict[str, list[dict] | Exception]:
+    """
+    Diarize a batch of prepared calls on the diarization CUDA stream.
+
+    Runs in a helper thread alongside transcribe_prepared() (see
+    model_streams()).
+
+    Returns:
+        call_id -> raw speaker segments, or the exception that call failed with
+    """
+    results = {}
+
+    with torch.cuda.stream(stream):
+        for p in prepared:
+            try:
+                results[p.call_id] = diarize(diarizer, p.waveform)
+            except Exception as e:
+                release_gpu_memory_after_oom(e)
+                results[p.call_id] = e
+        stream.synchronize()
+
+    return results
 
+
+def align_call(
+    prepared: PreparedCall,
+    transcript: str | Exception,
+    raw_segments: list[dict] | Exception,
+    repo: CallsRepository,
+) -> dict | None:
+    """
+    Align a transcribed and diarized call into its result row.
+
+    Args:
+        prepared: The prepared call
+        transcript: Transcript text, or the exception transcription raised
+        raw_segments: Speaker segments, or the exception diarization raised
+        repo: Database repository
+
+    Returns:
+        {"id", "text", "segments"} ready for save_results(), or None if the
+        call failed (already marked failed/retry)
+    """
+    call_id = prepared.call_id
+
+    try:
         # -----------------------------------------------------------------
-        # Step 4: Transcribe
+        # Step 4: Transcribe (done batched in transcribe_prepared)
         # -----------------------------------------------------------------
-        logger.info("Starting transcription...")
-        transcript_text = transcribe(asr_model, local_wav)
-        logger.info(f"Transcription complete - Len: {len(transcript_text)} chars")
+        if isinstance(transcript, Exception):
+            raise transcript
+        transcript_text = transcript
+        logger.info(f"Transcription complete for {call_id} - Len: {len(transcript_text)} chars")
 
         if len(transcript_text) == 0:
             logger.warning(f"Empty transcript for {call_id} - check audio quality")
 
         # -----------------------------------------------------------------
-        # Step 5: Diarize
+        # Step 5: Diarize (done concurrently in diarize_prepared)
         # -----------------------------------------------------------------
-        logger.info("Starting diarization...")
-        raw_segments = diarize(diarizer, local_wav)
-        logger.info(f"Diarization complete - {len(raw_segments)} raw segments")
+        if isinstance(raw_segments, Exception):
+            raise raw_segments
+        logger.info(f"Diarization complete for {call_id} - {len(raw_segments)} raw segments")
 
         # -----------------------------------------------------------------
         # Step 5.5: Align transcript with speaker segments
@@ -183,31 +329,128 @@ def process_call(
         segments = align_transcript_with_speakers(transcript_text, raw_segments)
         logger.info(f"Alignment complete - {len(segments)} merged segments with text")
 
-        # -----------------------------------------------------------------
-        # Step 6: Save results
-        # -----------------------------------------------------------------
-        repo.save_transcription(call_id, transcript_text, segments)
-        logger.info(f"COMPLETED {call_id} | Len: {len(transcript_text)} | Segments: {len(segments)}")
+        return {"id": call_id, "text": transcript_text, "segments": segments}
 
-        return True
+    except Exception as e:
+        fail_call(call_id, prepared.attempt, e, repo)
+        return None
+
+
+def save_results(results: list[dict], attempts: dict[str, int], repo: CallsRepository) -> int:
+    """
+    Step 6: Save a batch of results in one RPC.
+
+    If the batch write fails, saves one call at a time so a single bad row
+    cannot fail the others.
+
+    Args:
+        results: Result rows from align_call()
+        attempts: call_id -> attempt number, for marking failures
+        repo: Database repository
 
+    Returns:
+        Number of calls saved
+    """
+    if not results:
+        return 0
+
+    try:
+        repo.save_transcriptions(results)
+        saved = results
     except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Error processing {call_id}: {error_msg[:200]}")
+        logger.warning(f"Batched save failed, saving one at a time: {e}")
+        saved = []
+        for result in results:
+            try:
+                repo.save_transcription(result["id"], result["text"], result["segments"])
+                saved.append(result)
+            except Exception as save_error:
+                fail_call(result["id"], attempts[result["id"]], save_error, repo)
+
+    for result in saved:
+        logger.info(
+            f"COMPLETED {result['id']} | Len: {len(result['text'])} | "
+            f"Segments: {len(result['segments'])}"
+        )
+    return len(saved)
+
+
+def claim_batch(repo: CallsRepository, limit: int) -> tuple[list[dict], list[PreparedCall]]:
+    """
+    Claim up to `limit` calls and download/decode them concurrently.
 
-        # Mark as failed/retry
-        try:
-            repo.mark_failed(call_id, error_msg, retry_count + 1)
-        except Exception as db_error:
-            logger.error(f"Failed to update error status: {db_error}")
+    Runs in the prefetch thread while the previous batch is on the GPU, so
+    DB and storage latency overlap with GPU compute.
+
+    Returns:
+        (claimed calls, calls prepared successfully)
+    """
+    calls = repo.claim_pending_calls(limit)
+    if not calls:
+        return [], []
 
-        return False
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        prepared = [
+            p for p in executor.map(lambda call: prepare_call(call, repo), calls)
+            if p is not None
+        ]
+
+    return calls, prepared
 
-    finally:
-        # CRUCIAL: Always cleanup to prevent disk/VRAM leaks
-        cleanup_files(local_mp3, local_wav)
-        torch.cuda.empty_cache()
-        gc.collect()
+
+def process_batch(
+    prepared: list[PreparedCall],
+    repo: CallsRepository,
+    asr_model,
+    diarizer,
+    vad=None,
+) -> int:
+    """
+    Run a batch of prepared calls through the GPU pipeline.
+
+    Each waveform is decoded once and shared by both models: transcription
+    is batched on the GPU while diarization runs alongside it, each on its
+    own CUDA stream, then the calls are aligned and saved in one write. Models
+    stay resident and the CUDA cache is kept between calls (only released
+    after an OOM).
+
+    Args:
+        prepared: Calls from claim_batch()
+        repo: Database repository
+        asr_model: Loaded ASR model
+        diarizer: Loaded diarization pipeline
+        vad: Optional VAD model for chunking long calls
+
+    Returns:
+        Number of calls processed successfully
+    """
+    prepared = [p for p in prepared if fits_in_gpu_memory(p, repo)]
+    if not prepared:
+        return 0
+
+    try:
+        asr_stream, diarization_stream = model_streams()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            diarization_future = executor.submit(diarize_prepared, diarizer, prepared, diarization_stream)
+            with torch.cuda.stream(asr_stream):
+                transcripts = transcribe_prepared(asr_model, prepared, vad)
+            asr_stream.synchronize()
+            diarizations = diarization_future.result()
+
+        results = []
+        for p in prepared:
+            result = align_call(p, transcripts[p.call_id], diarizations[p.call_id], repo)
+            if result is not None:
+                results.append(result)
+    except Exception as e:
+        # Per-call errors are handled below this; anything escaping here
+        # would otherwise leave the whole batch stuck in 'processing'
+        release_gpu_memory_after_oom(e)
+        for p in prepared:
+            fail_call(p.call_id, p.attempt, e, repo)
+        return 0
+
+    return save_results(results, {p.call_id: p.attempt for p in prepared}, repo)
 
 
 # =============================================================================
@@ -234,6 +477,7 @@ def main():
     # Ensure tmp directory exists
     os.makedirs(settings.tmp_dir, exist_ok=True)
     os.environ["TMPDIR"] = settings.tmp_dir
+    logger.info(f"Temp dir: {settings.tmp_dir}")
 
     # -----------------------------------------------------------------
     # Verify GPU
@@ -245,29 +489,12 @@ def main():
         logger.critical(f"GPU verification failed: {e}")
         sys.exit(1)
 
-    # -----------------------------------------------------------------
-    # Load Models
-    # -----------------------------------------------------------------
-    try:
-        asr_model = load_asr_model(settings)
-        logger.info("ASR model loaded with beam decoding strategy")
-    except Exception as e:
-        logger.critical(f"Failed to load ASR model: {e}")
-        sys.exit(1)
-
-    try:
-        diarizer = load_diarization_pipeline(settings)
-        logger.info("Diarization pipeline loaded")
-    except Exception as e:
-        logger.critical(f"Failed to load diarization pipeline: {e}")
-        sys.exit(1)
-
     # -----------------------------------------------------------------
     # Connect to Database
     # -----------------------------------------------------------------
     try:
         supabase_client = create_client(settings.supabase_url, settings.supabase_service_role_key)
-        repo = CallsRepository(supabase_client)
+        repo = CallsRepository(supabase_client, settings.max_retries)
         logger.info("Connected to Supabase")
     except Exception as e:
         logger.critical(f"Failed to connect to Supabase: {e}")
@@ -276,10 +503,14 @@ def main():
     # -----------------------------------------------------------------
     # Log startup summary
     # -----------------------------------------------------------------
-    logger.info(f"Config: ASR={settings.asr_model}, Decoding={settings.decoding_strategy}")
+    logger.info(
+        f"Config: ASR={settings.asr_model}, Decoding={settings.decoding_strategy}, "
+        f"Batch={settings.factory_batch_size}, Compile={settings.compile_asr_encoder}, "
+        f"VAD={settings.vad_chunking}"
+    )
     logger.info(f"Log file: {settings.worker_log_path}")
     logger.info("=" * 60)
-    logger.info("Worker loop started")
+    logger.info("Worker loop started (models load once the queue has work)")
 
     # -----------------------------------------------------------------
     # Main Loop
@@ -287,25 +518,52 @@ def main():
     processed_count = 0
     error_count = 0
 
-    while not shutdown_requested:
+    # While one batch is on the GPU, the next is claimed and downloaded here
+    prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+    next_batch = None
+
+    # On shutdown, stop claiming but still finish a batch already prefetched
+    while not shutdown_requested or next_batch is not None:
         try:
-            # Fetch next call from queue
-            call = repo.fetch_next_pending_call()
+            # Models load once there is work, not at boot. They load before
+            # anything is claimed: claiming bumps retry_count, so a slow or
+            # failing load must not eat the attempts of calls held meanwhile.
+            if _models is None:
+                if repo.get_queue_stats()["downloaded"] == 0:
+                    # Queue empty - wait and retry
+                    time.sleep(settings.poll_interval)
+                    continue
+                try:
+                    ensure_models(settings)
+                except Exception as e:
+                    logger.critical(f"Failed to load models: {e}")
+                    sys.exit(1)
+            asr_model, diarizer, vad = _models
+
+            # Fetch, lock and download next batch of calls from queue
+            if next_batch is not None:
+                future, next_batch = next_batch, None
+                calls, prepared = future.result()
+            else:
+                calls, prepared = claim_batch(repo, settings.factory_batch_size)
 
-            if call is None:
+            if not calls:
                 # Queue empty - wait and retry
                 time.sleep(settings.poll_interval)
                 continue
 
-            # Process the call
-            success = process_call(call, repo, asr_model, diarizer, settings)
+            # Download the next batch while this one is on the GPU
+            if not shutdown_requested:
+                next_batch = prefetcher.submit(claim_batch, repo, settings.factory_batch_size)
 
-            if success:
-                processed_count += 1
-                if processed_count % 10 == 0:
-                    logger.info(f"Milestone: {processed_count} calls processed")
-            else:
-                error_count += 1
+            # Process the batch
+            succeeded = process_batch(prepared, repo, asr_model, diarizer, vad)
+
+            previous_count = processed_count
+            processed_count += succeeded
+            error_count += len(calls) - succeeded
+            if processed_count // 10 > previous_count // 10:
+                logger.info(f"Milestone: {processed_count} calls processed")
 
         except KeyboardInterrupt:
             logger.info("Worker stopped by user")
@@ -316,6 +574,8 @@ def main():
             error_count += 1
             time.sleep(5)  # Back off on unexpected errors
 
+    prefetcher.shutdown(wait=True)
+
     # -----------------------------------------------------------------
     # Shutdown
     # -----------------------------------------------------------------
@@ -30,8 +30,11 @@ from typing import Any
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from dotenv import dotenv_values
 from supabase import create_client
 
+from workers.core.db import QUEUE_STATUSES, fetch_queue_stats
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -96,22 +99,12 @@ def get_queue_stats(supabase_url: str, supabase_key: str) -> dict[str, int]:
         client = create_client(supabase_url, supabase_key)
         schema = client.schema("core")
 
-        stats = {}
-        statuses = ["pending", "downloaded", "processing", "transcribed", "flagged", "safe", "failed"]
-
-        for status in statuses:
-            response = (
-                schema.from_("calls")
-                .select("id", count="exact")
-                .eq("status", status)
-                .execute()
-            )
-            stats[status] = response.count or 0
+        stats = fetch_queue_stats(schema)
 
         # Check for stuck calls (processing > 30 min)
         stuck_response = (
             schema.from_("calls")
-            .select("id", count="exact")
+            .select("id", count="exact", head=True)
             .eq("status", "processing")
             .lt("updated_at", (datetime.now(timezone.utc).isoformat()))
             .execute()
@@ -119,7 +112,7 @@ def get_queue_stats(supabase_url: str, supabase_key: str) -> dict[str, int]:
         # Note: Proper stuck detection would need SQL, approximating here
         stats["stuck"] = 0  # Would need raw SQL for time comparison
 
-        stats["total"] = sum(stats.get(s, 0) for s in statuses)
+        stats["total"] = sum(stats.get(s, 0) for s in QUEUE_STATUSES)
 
         return stats
     except Exception as e:
@@ -330,12 +323,9 @@ def main():
     env_file = Path(__file__).parent.parent / ".env"
     if env_file.exists() and not os.environ.get("SUPABASE_URL"):
         logger.info(f"Loading environment from {env_file}")
-        with open(env_file) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith("#") and "=" in line:
-                    key, value = line.split("=", 1)
-                    os.environ.setdefault(key.strip(), value.strip())
+        for key, value in dotenv_values(env_file).items():
+            if value is not None:
+                os.environ.setdefault(key, value)
 
     server = HTTPServer(("0.0.0.0", port), HealthHandler)
 
@@ -443,7 +443,7 @@ class IngestRepository:
             try:
                 response = (
                     self.schema.from_("calls")
-                    .select("id", count="exact")
+                    .select("id", count="exact", head=True)
                     .eq("status", status)
                     .execute()
                 )
@@ -419,7 +419,7 @@ class JudgeRepository:
                 response = (
                     self.schema
                     .from_("calls")
-                    .select("id", count="exact")
+                    .select("id", count="exact", head=True)
                     .eq("status", status)
                     .execute()
                 )
@@ -31,6 +31,7 @@ from supabase import create_client
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from workers.core import get_settings, setup_logging
+from workers.core.db import QUEUE_STATUSES, fetch_queue_stats
 
 # =============================================================================
 # CONFIGURATION
@@ -124,7 +125,8 @@ class VaultRepository:
         - storage_path IS NULL
 
         The lock value format is 'vault_lock:{first 8 chars of id}'.
-        This prevents multiple workers from processing the same call.
+        Uses the core.acquire_vault_lock() RPC (FOR UPDATE SKIP LOCKED), so
+        competing workers return immediately instead of queueing on the row.
 
         Args:
             call_id: UUID of the call to lock
@@ -132,23 +134,9 @@ class VaultRepository:
         Returns:
             True if lock acquired, False if another worker claimed it
         """
-        lock_value = f"vault_lock:{call_id[:8]}"
-
         try:
-            response = (
-                self.schema
-                .from_("calls")
-                .update({
-                    "storage_path": lock_value,
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                })
-                .eq("id", call_id)
-                .eq("status", "pending")
-                .is_("storage_path", "null")
-                .execute()
-            )
+            response = self.schema.rpc("acquire_vault_lock", {"p_call_id": call_id}).execute()
 
-            # Python Supabase client returns empty list when no rows affected
             if not response.data:
                 logger.debug(f"Lock failed for {call_id} - claimed by another worker")
                 return False
@@ -248,21 +236,11 @@ class VaultRepository:
             logger.error(f"Failed to mark {call_id} as failed: {e}")
 
     def get_queue_stats(self) -> dict[str, int]:
-        """Get count of calls by status."""
-        stats = {}
-        for status in ["pending", "downloaded", "processing", "transcribed", "flagged", "safe", "failed"]:
-            try:
-                response = (
-                    self.schema
-                    .from_("calls")
-                    .select("id", count="exact")
-                    .eq("status", status)
-                    .execute()
-                )
-                stats[status] = response.count or 0
-            except Exception:
-                stats[status] = -1
-        return stats
+        """Get count of calls by status (-1 for every status on failure)."""
+        try:
+            return fetch_queue_stats(self.schema)
+        except Exception:
+            return {status: -1 for status in QUEUE_STATUSES}
 
 
 # =============================================================================